@@ -3,17 +3,26 @@ from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
 from flask_cors import CORS
 from config import Config
-from extensions import db, mail, bcrypt 
+from extensions import db, mail, bcrypt, compress, cache, ORJSONProvider
 from flask_login import LoginManager
 from models.database import User
 from routes.auth_routes import auth_bp
 from routes.allergy_routes import allergy_bp
 from routes.password_reset import password_reset
 from routes.user import user_bp
+from routes.admin import admin_bp
+from utils.ai_processing import clients as ai_clients
+from utils.verdicts import refresher as verdict_refresher
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
+    app.json = ORJSONProvider(app)
     app.config.from_object(Config)
+    if test_config:
+        app.config.update(test_config)
+    app.config.setdefault("COMPRESS_ALGORITHM", ["br", "gzip"])
+    app.config.setdefault("COMPRESS_MIMETYPES", ["application/json", "text/html"])
+    app.config.setdefault("COMPRESS_MIN_SIZE", 500)
     CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
     jwt = JWTManager(app)
 
@@ -25,6 +34,9 @@ def create_app():
     migrate = Migrate(app, db)
     mail.init_app(app)
     bcrypt.init_app(app)
+    compress.init_app(app)
+    cache.init_app(app)
+    verdict_refresher.init_app(app)
 
     login_manager = LoginManager(app)
     login_manager.init_app(app)
@@ -39,6 +51,10 @@ def create_app():
     app.register_blueprint(allergy_bp, url_prefix="/allergy")
     app.register_blueprint(password_reset, url_prefix="/password")
     app.register_blueprint(user_bp, url_prefix="/user")
+    app.register_blueprint(admin_bp, url_prefix="/admin")
+
+    if app.config.get("GEMINI_WARM_ON_START"):
+        ai_clients.warm_in_background()
 
     @app.route("/")
     def home():
@@ -0,0 +1,24 @@
+"""
+ASGI entry point. Serve with an ASGI server, e.g.:
+
+    uvicorn asgi:app --workers 4
+
+`/allergy/check_product` runs as a native coroutine so requests waiting on the
+AI do not hold a thread; everything else is served by the Flask app on a
+thread pool sized by `ASGI_THREADS`. See `utils/asgi.py`.
+
+`MAIL_SEND_ASYNC` defaults to True here, so password-reset emails go to the
+mail pool instead of holding one of those threads for the SMTP round trip.
+Set it to False in the config to send them inline.
+"""
+
+from app import create_app
+from routes.allergy_routes import check_product_async
+from utils.asgi import AsgiServer
+
+flask_app = create_app()
+flask_app.config.setdefault("MAIL_SEND_ASYNC", True)
+
+app = AsgiServer(flask_app, {
+    ("POST", "/allergy/check_product"): check_product_async,
+})
@@ -0,0 +1,100 @@
+"""
+Measure per-call overhead of Gemini model handles against a local HTTP stand-in.
+
+Compares a fresh SDK client per call, a fresh `GenerativeModel` per call (the old
+behaviour) and the shared handles from `utils.ai_processing.clients`, and counts
+how many TCP connections the stand-in accepted for each. The stand-in is plain
+HTTP, so the SDK is switched to its REST transport here; production uses the
+SDK default (gRPC). The SDK caches its client between `GenerativeModel`
+instances, so "new model per call" and "shared model" open the same number of
+connections and differ only by the cost of building the handle.
+
+Usage:
+    python benchmarks/bench_ai_clients.py [calls]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REPLY = json.dumps({
+    "candidates": [{
+        "content": {"parts": [{"text": "Verdict: Safe\nExplanation: No listed allergens."}], "role": "model"},
+        "finishReason": "STOP",
+    }],
+}).encode()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        StandInHandler.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(REPLY)))
+        self.end_headers()
+        self.wfile.write(REPLY)
+
+    def log_message(self, *args):
+        pass
+
+
+def run(label, call, calls):
+    StandInHandler.connections = 0
+    call()
+    start = time.perf_counter()
+    for _ in range(calls):
+        call()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / calls * 1e3:7.3f} ms/call  connections: {StandInHandler.connections}")
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    from config import Config
+    Config.GEMINI_API_KEY = "stand-in"
+    Config.GEMINI_TRANSPORT = "rest"
+    Config.GEMINI_API_ENDPOINT = f"http://127.0.0.1:{server.server_port}"
+
+    import google.generativeai as genai
+    from utils.ai_processing import MODEL_NAME, clients, configure_genai
+
+    def new_client_per_call():
+        configure_genai()
+        genai.GenerativeModel(MODEL_NAME).generate_content("ping")
+
+    def new_model_per_call():
+        genai.GenerativeModel(MODEL_NAME).generate_content("ping")
+
+    def shared_model():
+        clients.get().generate_content("ping")
+
+    for label, call in (
+        ("new SDK client per call", new_client_per_call),
+        ("new model per call", new_model_per_call),
+        ("shared model", shared_model),
+    ):
+        clients.reset()
+        run(label, call, calls)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
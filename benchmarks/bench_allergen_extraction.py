@@ -0,0 +1,82 @@
+"""
+Precision, recall and throughput of the offline allergen extractor.
+
+Scores `utils.allergen_extraction` and the keyword regex in
+`utils.pdf_processing` against the labelled lab reports in
+`fixtures/lab_reports.json`. Regex output is mapped onto canonical names
+through the extractor's lexicon where possible. The label extractor is scored
+against `fixtures/food_labels.json`.
+
+Usage:
+    python benchmarks/bench_allergen_extraction.py [repeat]
+"""
+
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from utils.allergen_extraction import get_extractor, get_label_extractor
+from utils.pdf_processing import extract_allergens as regex_extract_allergens
+
+
+def score(predicted, expected):
+    true_positive = false_positive = false_negative = 0
+    for got, want in zip(predicted, expected):
+        got, want = set(got), set(want)
+        true_positive += len(got & want)
+        false_positive += len(got - want)
+        false_negative += len(want - got)
+
+    precision = true_positive / (true_positive + false_positive) if true_positive + false_positive else 0.0
+    recall = true_positive / (true_positive + false_negative) if true_positive + false_negative else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with open(os.path.join(HERE, "fixtures", "lab_reports.json")) as f:
+        reports = json.load(f)
+
+    texts = [r["text"] for r in reports]
+    expected = [r["allergens"] for r in reports]
+    lines = sum(len(t.splitlines()) for t in texts) * repeat
+    extractor = get_extractor()
+
+    def regex(texts):
+        return [
+            [extractor.canonical.get(a, a) for a in regex_extract_allergens(t)]
+            for t in texts
+        ]
+
+    for label, run in (("lexicon + rules", extractor.extract_batch), ("keyword regex", regex)):
+        predicted = run(texts)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            run(texts)
+        elapsed = time.perf_counter() - start
+
+        precision, recall, f1 = score(predicted, expected)
+        print(
+            f"{label:<16} precision {precision:.2f}  recall {recall:.2f}  f1 {f1:.2f}  "
+            f"{lines / elapsed:,.0f} lines/s"
+        )
+
+    for report, got in zip(reports, extractor.extract_batch(texts)):
+        missed, extra = set(report["allergens"]) - set(got), set(got) - set(report["allergens"])
+        if missed or extra:
+            print(f"  {report['text'].splitlines()[0]!r}: missed {sorted(missed)}, extra {sorted(extra)}")
+
+    with open(os.path.join(HERE, "fixtures", "food_labels.json")) as f:
+        labels = json.load(f)
+    got = get_label_extractor().extract_batch([label["text"] for label in labels])
+    precision, recall, f1 = score(got, [label["allergens"] for label in labels])
+    print(f"{'food labels':<16} precision {precision:.2f}  recall {recall:.2f}  f1 {f1:.2f}")
+
+
+if __name__ == "__main__":
+    main()
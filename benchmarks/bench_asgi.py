@@ -0,0 +1,118 @@
+"""
+Concurrent /allergy/check_product throughput: sync vs async handling in ASGI mode.
+
+Both runs use the same uvicorn server and thread pool (`ASGI_THREADS`). In
+"sync" mode the route is served by the Flask view, which holds a pool thread
+for the whole AI call; in "async" mode it is the native coroutine from
+`asgi.py`, which awaits the call. The AI backend is faked with a fixed latency.
+
+Usage:
+    python benchmarks/bench_asgi.py [requests] [concurrency] [latency_seconds] [threads]
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+from sqlalchemy import event
+from config import Config
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench.db")
+Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{DB_PATH}"
+
+import utils.ai_processing as ai_processing
+from app import create_app
+from extensions import db
+from flask_jwt_extended import create_access_token
+from models.database import User
+from routes.allergy_routes import check_product_async
+from utils.asgi import AsgiServer
+
+
+def fake_backend(latency):
+    def check(product_name, user_allergies):
+        time.sleep(latency)
+        return "Safe", "Fake backend."
+
+    async def check_async(product_name, user_allergies):
+        await asyncio.sleep(latency)
+        return "Safe", "Fake backend."
+
+    ai_processing._check_product_safety = check
+    ai_processing._check_product_safety_async = check_async
+
+
+def serve(asgi_app):
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(asgi_app, log_level="warning", lifespan="on", timeout_keep_alive=120))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+async def load(url, token, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/allergy/check_product",
+                    json={"product_name": uuid.uuid4().hex[:12]},
+                    headers={"Authorization": f"Bearer {token}"},
+                )
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(requests)])
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return requests / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    threads = int(sys.argv[4]) if len(sys.argv) > 4 else 8
+
+    fake_backend(latency)
+    flask_app = create_app({"ASGI_THREADS": threads, "VERDICT_REFRESH_ENABLED": False})
+
+    with flask_app.app_context():
+        event.listen(db.engine, "connect", lambda conn, _: conn.execute("PRAGMA journal_mode=WAL"))
+        db.engine.dispose()
+        db.create_all()
+        user = User(email="bench@example.com", username="bench", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        token = create_access_token(identity=str(user.id))
+
+    print(f"{requests} requests, {concurrency} concurrent, {latency * 1000:.0f} ms AI latency, {threads} threads")
+    for mode, routes in (
+        ("sync", {}),
+        ("async", {("POST", "/allergy/check_product"): check_product_async}),
+    ):
+        server, url = serve(AsgiServer(flask_app, routes))
+        throughput, p50, p95 = asyncio.run(load(url, token, requests, concurrency))
+        server.should_exit = True
+        print(f"  {mode:<6} {throughput:7.1f} req/s   p50 {p50 * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
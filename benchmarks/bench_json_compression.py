@@ -0,0 +1,78 @@
+"""
+Benchmark JSON serialization and response size for the heaviest allergy payloads.
+
+Compares the stdlib JSON provider against `ORJSONProvider`, and the bytes sent
+for identity, gzip and brotli encodings through Flask-Compress.
+
+Usage:
+    python benchmarks/bench_json_compression.py
+"""
+
+import os
+import random
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+from flask_compress import Compress
+from extensions import ORJSONProvider
+
+random.seed(0)
+
+def random_name():
+    return " ".join(
+        "".join(random.choices(string.ascii_lowercase, k=random.randint(3, 9)))
+        for _ in range(random.randint(1, 3))
+    )
+
+PAYLOADS = {
+    "GET /allergy/ (2000 allergies)": {
+        "allergies": [random_name() for _ in range(2000)],
+        "version": 2000,
+        "next_cursor": None,
+    },
+    "POST /allergy/add_batch (500 added)": {
+        "message": "Added 500 new allergies.",
+        "added": [random_name() for _ in range(500)],
+    },
+    "POST /allergy/upload (large report)": {
+        "allergens": [random_name() for _ in range(1200)],
+        "message": "Select only the allergies you actually have.",
+    },
+}
+
+def make_app(provider_class):
+    app = Flask(__name__)
+    app.json = provider_class(app)
+    app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+    app.config["COMPRESS_MIMETYPES"] = ["application/json"]
+    app.config["COMPRESS_MIN_SIZE"] = 500
+    Compress(app)
+
+    @app.route("/<int:index>")
+    def payload(index):
+        return jsonify(list(PAYLOADS.values())[index])
+
+    return app
+
+def main():
+    apps = {"stdlib": make_app(DefaultJSONProvider), "orjson": make_app(ORJSONProvider)}
+
+    for index, (label, payload) in enumerate(PAYLOADS.items()):
+        print(label)
+        for name, app in apps.items():
+            with app.app_context():
+                seconds = min(timeit.repeat(lambda: app.json.response(payload), number=200, repeat=5)) / 200
+            print(f"  {name:<7} serialize: {seconds * 1e6:8.1f} us")
+
+        client = apps["orjson"].test_client()
+        for encoding in ("identity", "gzip", "br"):
+            response = client.get(f"/{index}", headers={"Accept-Encoding": encoding})
+            print(f"  {encoding:<8} bytes on wire: {len(response.get_data()):8d}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Measure database cost of the password reset flow.
+
+Seeds an in-memory SQLite database with users, then runs request -> open link
+-> submit new password and reports SQL statements and wall time per step.
+
+Usage:
+    python benchmarks/bench_reset_flow.py [users]
+"""
+
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask
+from sqlalchemy import event
+from extensions import db, mail
+from models.database import User
+from routes.auth_routes import auth_bp
+from routes.password_reset import password_reset
+
+
+def make_app():
+    app = Flask(__name__, template_folder=os.path.join(ROOT, "templates"))
+    app.config.update(
+        SECRET_KEY="bench",
+        SQLALCHEMY_DATABASE_URI="sqlite://",
+        MAIL_SUPPRESS_SEND=True,
+        MAIL_SEND_ASYNC=False,
+        MAIL_DEFAULT_SENDER="bench@example.com",
+    )
+    db.init_app(app)
+    mail.init_app(app)
+    app.register_blueprint(auth_bp, url_prefix="/auth")
+    app.register_blueprint(password_reset, url_prefix="/password")
+    return app
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    app = make_app()
+
+    with app.app_context():
+        db.create_all()
+        db.session.execute(
+            db.insert(User),
+            [{"email": f"user{i}@example.com", "username": f"user{i}", "password_hash": "x"} for i in range(users)],
+        )
+        db.session.commit()
+
+        statements = []
+        event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        client = app.test_client()
+
+        def step(label, call):
+            statements.clear()
+            start = time.perf_counter()
+            response = call()
+            elapsed = time.perf_counter() - start
+            print(f"{label:<24} status {response.status_code}  {len(statements)} statements  {elapsed * 1e3:7.2f} ms")
+            return response
+
+        email = f"user{users // 2}@example.com"
+        with mail.record_messages() as outbox:
+            step("request reset", lambda: client.post("/password/reset", data={"email": email}))
+        token = outbox[0].body.rsplit("/", 1)[1]
+
+        step("open reset link", lambda: client.get(f"/password/reset_token/{token}"))
+        step("submit new password", lambda: client.post(f"/password/reset_token/{token}", data={"password": "new"}))
+        step("reuse link", lambda: client.post(f"/password/reset_token/{token}", data={"password": "again"}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Query-plan regression check for the queries the routes run.
+
+Builds the schema with the Alembic migrations (not `create_all`, so missing
+indexes in a migration are caught) and seeds the user, allergy, allergy change,
+product and verdict tables. It then drives every route and background job
+through the test client with a `before_cursor_execute` hook recording the SQL
+actually sent, runs EXPLAIN on each distinct statement and exits non-zero if
+any of them reads a whole table instead of using an index.
+
+Usage:
+    python benchmarks/check_query_plans.py [rows] [database_url]
+
+`rows` defaults to 1,000,000 per table. `database_url` defaults to a temporary
+SQLite file; pass a PostgreSQL URL to check that planner instead (its tables
+are dropped and recreated). `tests/test_query_plans.py` runs the same check on
+a small database with the test suite.
+"""
+
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import request, request_started
+from flask_migrate import downgrade, upgrade
+from sqlalchemy import event
+from app import create_app
+from extensions import db, mail
+from models.database import Allergy, AllergyChange, Product, User, UserProductVerdict
+import utils.ai_processing as ai_processing
+import utils.image_processing as image_processing
+from utils.product_search import product_index, seed_products
+from utils.verdicts import refresher
+
+CHUNK = 50_000
+# Endpoints that never touch the database; every other one must be exercised.
+NO_DATABASE_ENDPOINTS = {"home", "static", "auth.protected", "allergy.upload_file", "admin.get_stats"}
+STATEMENT = re.compile(r"^\s*(?:SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+
+
+def build_app(database_url, **config):
+    """Create the app against `database_url` and migrate it to the latest revision."""
+    app = create_app({
+        **config,
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": database_url,
+        "VERDICT_REFRESH_ENABLED": False,
+        "CACHE_BACKEND": "lru",
+        "MAIL_SUPPRESS_SEND": True,
+        "MAIL_DEFAULT_SENDER": "plans@example.com",
+    })
+    directory = os.path.join(ROOT, "migrations")
+    with app.app_context():
+        if db.engine.dialect.name != "sqlite":
+            downgrade(directory=directory, revision="base")
+        upgrade(directory=directory)
+    return app
+
+
+def seed(table, make_row, rows):
+    for start in range(0, rows, CHUNK):
+        db.session.execute(db.insert(table), [make_row(i) for i in range(start, min(start + CHUNK, rows))])
+    db.session.commit()
+
+
+def seed_all(rows):
+    now = datetime.utcnow()
+    users = max(rows // 10, 1)
+    seed(User, lambda i: {"email": f"user{i}@example.com", "username": f"user{i}", "password_hash": "x"}, rows)
+    seed(Product, lambda i: {"name": f"product {i}", "curated": i % 10 == 0}, rows)
+    seed(Allergy, lambda i: {"user_id": i % users + 1, "name": f"allergen {i // users}"}, rows)
+    seed(AllergyChange, lambda i: {"user_id": i % users + 1, "version": i // users + 1,
+                                   "name": f"allergen {i // users}", "action": "add"}, rows)
+    seed(UserProductVerdict, lambda i: {"user_id": i % users + 1, "product_id": i + 1, "verdict": "Safe",
+                                        "allergy_version": 1, "stale": i % 100 == 0, "checked_at": now}, rows)
+    db.session.execute(db.text("ANALYZE"))
+    db.session.commit()
+
+
+class StatementLog:
+    """
+    Records each distinct SQL statement sent while it is attached, with the step
+    that sent it, and the endpoints of the requests made meanwhile.
+    """
+
+    def __init__(self):
+        self.step = None
+        self.statements = {}
+        self.endpoints = set()
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not STATEMENT.match(statement):
+            return
+        if executemany and isinstance(parameters, list):
+            parameters = parameters[0]
+        entry = self.statements.setdefault(statement, {"steps": [], "parameters": parameters})
+        if self.step not in entry["steps"]:
+            entry["steps"].append(self.step)
+
+    def request_started(self, sender, **extra):
+        self.endpoints.add(request.endpoint)
+
+    @contextmanager
+    def attached(self, app, engine):
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        request_started.connect(self.request_started, app)
+        try:
+            yield self
+        finally:
+            request_started.disconnect(self.request_started, app)
+            event.remove(engine, "before_cursor_execute", self.before_cursor_execute)
+
+    def unexercised(self, app):
+        """Endpoints of `app` that may query the database but were not requested."""
+        endpoints = {rule.endpoint for rule in app.url_map.iter_rules()}
+        return sorted(endpoints - self.endpoints - NO_DATABASE_ENDPOINTS)
+
+
+@contextmanager
+def stand_ins():
+    """Replace the Gemini call and OCR so the routes that use them run offline."""
+    saved = ai_processing._check_product_safety, image_processing.extract_text_from_image
+    ai_processing._check_product_safety = lambda name, allergies: ("Safe", "Stand-in verdict.")
+    image_processing.extract_text_from_image = lambda image: image.read().decode()
+    try:
+        yield
+    finally:
+        ai_processing._check_product_safety, image_processing.extract_text_from_image = saved
+
+
+def exercise(app, log):
+    """Drive every route and background job that queries the database, labelling each step in `log`."""
+    client = app.test_client()
+
+    def step(name, call, *expected):
+        log.step = name
+        response = call()
+        status = getattr(response, "status_code", None)
+        if expected and status not in expected:
+            raise AssertionError(f"{name}: expected {expected}, got {status}: {response.get_data(as_text=True)[:200]}")
+        return response
+
+    step("auth.register", lambda: client.post(
+        "/auth/register", json={"email": "plans@example.com", "username": "plans", "password": "pw"}), 201)
+    token = step("auth.login", lambda: client.post(
+        "/auth/login", json={"username": "plans", "password": "pw"}), 200).get_json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    with app.app_context():
+        user_id = db.session.execute(db.select(User.id).where(User.username == "plans")).scalar_one()
+    app.config["ADMIN_USER_IDS"] = [user_id]
+
+    step("user.get_profile", lambda: client.get("/user/profile", headers=headers), 200)
+    step("user.update_profile", lambda: client.put(
+        "/user/profile", json={"username": "plans2", "email": "plans2@example.com"}, headers=headers), 200)
+
+    for name in ("peanuts", "milk", "soy"):
+        step("allergy.add_allergy", lambda: client.post("/allergy/add", json={"allergy": name}, headers=headers), 200)
+    full = step("allergy.get_allergies", lambda: client.get("/allergy/", headers=headers), 200)
+    page = step("allergy.get_allergies (page)", lambda: client.get("/allergy/?limit=2", headers=headers), 200)
+    step("allergy.get_allergies (next page)", lambda: client.get(
+        f"/allergy/?limit=2&cursor={page.get_json()['next_cursor']}", headers=headers), 200)
+    step("allergy.get_allergies (since)", lambda: client.get("/allergy/?since=1", headers=headers), 200)
+    step("allergy.get_allergies (304)", lambda: client.get(
+        "/allergy/", headers=dict(headers, **{"If-None-Match": full.headers["ETag"]})), 304)
+
+    with stand_ins():
+        for name in ("Product 1", "product 1", "Brand new product"):
+            step("allergy.check_product", lambda: client.post(
+                "/allergy/check_product", json={"product_name": name}, headers=headers), 200)
+        step("allergy.upload_label", lambda: client.post(
+            "/allergy/upload_label", data={"files": [(io.BytesIO(b"Contains: milk"), "label.png")]},
+            headers=headers, content_type="multipart/form-data"), 200)
+
+    step("allergy.get_product_verdicts", lambda: client.get("/allergy/products", headers=headers), 200)
+    product_index.__init__()
+    step("allergy.search_products", lambda: client.get("/allergy/products/search?q=produc", headers=headers), 200)
+
+    step("allergy.edit_allergy", lambda: client.put(
+        "/allergy/edit", json={"old_name": "soy", "new_name": "tree nuts"}, headers=headers), 200)
+    step("allergy.edit_allergy (conflict)", lambda: client.put(
+        "/allergy/edit", json={"old_name": "milk", "new_name": "peanuts"}, headers=headers), 409)
+    step("allergy.delete_allergy", lambda: client.delete("/allergy/milk", headers=headers), 200)
+    step("allergy.delete_allergies", lambda: client.post(
+        "/allergy/delete_batch", json={"allergies": ["tree nuts"]}, headers=headers), 200)
+    step("allergy.save_selected_allergies", lambda: client.post(
+        "/allergy/save", json={"allergies": ["egg"]}, headers=headers), 200)
+    step("allergy.add_batch_allergies", lambda: client.post(
+        "/allergy/add_batch", json={"allergies": ["fish", "wheat"]}, headers=headers), 200)
+
+    with app.app_context(), stand_ins():
+        log.step = "verdicts.stale_user_ids"
+        refresher.stale_user_ids()
+        log.step = "verdicts.refresh_user"
+        refresher.refresh_user(user_id)
+        db.session.remove()
+
+    with mail.record_messages() as outbox:
+        step("password_reset.reset_request", lambda: client.post(
+            "/password/reset", data={"email": "plans2@example.com"}), 302)
+    reset_url = re.search(r"(/password/reset_token/\S+)", outbox[0].body).group(1)
+    step("password_reset.reset_token", lambda: client.post(reset_url, data={"password": "new"}), 302)
+
+    def first_export_line():
+        response = client.get("/admin/export", headers=headers, buffered=False)
+        next(iter(response.response))
+        response.close()
+        return response
+
+    step("admin.export_data", first_export_line, 200)
+    records = [
+        {"email": "imported@example.com", "username": "imported", "password_hash": "x", "allergies": ["milk"]},
+        {"email": "user1@example.com", "username": "user1", "password_hash": "x", "allergies": []},
+    ]
+    step("admin.import_data", lambda: client.post(
+        "/admin/import", data="".join(json.dumps(r) + "\n" for r in records), headers=headers), 200)
+
+    with app.app_context():
+        log.step = "product_search.seed_products"
+        seed_products(["product 2", "curated newcomer"])
+        db.session.commit()
+
+
+def explain(sql, parameters):
+    """Return (plan lines, full-scan lines) for a captured statement on the current dialect."""
+    dialect = db.engine.dialect.name
+    connection = db.session.connection()
+
+    if dialect == "sqlite":
+        lines = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parameters)]
+        scans = [line for line in lines if re.match(r"SCAN (?!CONSTANT ROW)", line)]
+    elif dialect == "postgresql":
+        lines = [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {sql}", parameters)]
+        scans = [line for line in lines if "Seq Scan" in line]
+    else:
+        raise SystemExit(f"Unsupported dialect: {dialect}")
+    return lines, scans
+
+
+def check(app, rows):
+    """
+    Seed `rows` rows per table, exercise the routes and EXPLAIN what they ran.
+
+    Returns:
+        tuple: (results, unexercised endpoints), with results holding
+        (steps, sql, plan lines, full-scan lines) per distinct statement.
+    """
+    with app.app_context():
+        seed_all(rows)
+
+    log = StatementLog()
+    with app.app_context():
+        engine = db.engine
+    with log.attached(app, engine):
+        exercise(app, log)
+
+    results = []
+    with app.app_context():
+        for sql, entry in log.statements.items():
+            lines, scans = explain(sql, entry["parameters"])
+            results.append((entry["steps"], sql, lines, scans))
+        db.session.rollback()
+    return results, log.unexercised(app)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    url = sys.argv[2] if len(sys.argv) > 2 else f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plans.db')}"
+
+    app = build_app(url)
+    start = time.perf_counter()
+    results, unexercised = check(app, rows)
+    print(f"Seeded {rows:,} rows per table and checked in {time.perf_counter() - start:.1f}s\n")
+
+    failures = 0
+    for steps, sql, lines, scans in results:
+        failures += bool(scans)
+        print(f"{'FULL SCAN' if scans else 'ok':9}  {', '.join(steps)}")
+        print(f"           {' '.join(sql.split())}")
+        for line in lines:
+            print(f"             {line}")
+
+    print(f"\n{len(results) - failures}/{len(results)} statements use an index")
+    if unexercised:
+        print(f"Not exercised, add them to exercise(): {', '.join(unexercised)}")
+    sys.exit(1 if failures or unexercised else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,66 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_mail import Mail
+from flask_compress import Compress
+from flask.json.provider import DefaultJSONProvider
 from itsdangerous import URLSafeTimedSerializer 
 from flask import current_app
+from utils.cache import Cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 db = SQLAlchemy()
 bcrypt = Bcrypt()
 mail = Mail()
+compress = Compress()
+cache = Cache()
 
 def get_serializer():
-    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"])
\ No newline at end of file
+    return URLSafeTimedSerializer(current_app.config["SECRET_KEY"])
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider that serializes with orjson when it is installed and falls back
+    to the stdlib encoder otherwise (or when stdlib-only options are requested).
+
+    Responses decode to the same values as the stdlib provider's: dates go through
+    `default`, so they are RFC 1123 strings as Flask writes them, and debug responses
+    are indented. The bytes differ for non-ASCII text, which orjson writes as UTF-8
+    where the stdlib escapes it as `\\uXXXX`. Objects orjson cannot encode, such as
+    integers beyond 64 bits, are serialized with the stdlib encoder.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self._dumps_bytes(obj, pretty) + b"\n", mimetype=self.mimetype)
+
+    def _dumps_bytes(self, obj, pretty=False):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except orjson.JSONEncodeError:
+            pass
+        dump_args = {"indent": 2} if pretty else {"separators": (",", ":")}
+        return super().dumps(obj, **dump_args).encode()
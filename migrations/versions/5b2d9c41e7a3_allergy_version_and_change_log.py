@@ -0,0 +1,43 @@
+"""Add allergy version counter and change log
+
+Revision ID: 5b2d9c41e7a3
+Revises: 046e58f777cd
+Create Date: 2026-10-19 09:12:04.118320
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2d9c41e7a3'
+down_revision = '046e58f777cd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('allergy_version', sa.Integer(), server_default='0', nullable=False))
+
+    op.create_table('allergy_change',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('action', sa.String(length=10), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fk_allergy_change_user_id'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('allergy_change', schema=None) as batch_op:
+        batch_op.create_index('ix_allergy_change_user_version', ['user_id', 'version'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('allergy_change', schema=None) as batch_op:
+        batch_op.drop_index('ix_allergy_change_user_version')
+
+    op.drop_table('allergy_change')
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('allergy_version')
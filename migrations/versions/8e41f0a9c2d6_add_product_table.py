@@ -0,0 +1,29 @@
+"""Add product table
+
+Revision ID: 8e41f0a9c2d6
+Revises: 5b2d9c41e7a3
+Create Date: 2026-10-19 11:40:27.502913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e41f0a9c2d6'
+down_revision = '5b2d9c41e7a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('product',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('product')
@@ -0,0 +1,26 @@
+"""Add refresh lease to user_product_verdict
+
+Revision ID: a7c3e5f91d24
+Revises: f2a6d8c4e913
+Create Date: 2026-10-21 09:42:17.604215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e5f91d24'
+down_revision = 'f2a6d8c4e913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_product_verdict', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('refreshing_until', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user_product_verdict', schema=None) as batch_op:
+        batch_op.drop_column('refreshing_until')
@@ -0,0 +1,29 @@
+"""Drop unused reset token columns from user
+
+Revision ID: c3f7a2e91b54
+Revises: 8e41f0a9c2d6
+Create Date: 2026-10-19 14:05:52.331847
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f7a2e91b54'
+down_revision = '8e41f0a9c2d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('reset_token_expiration')
+        batch_op.drop_column('reset_token')
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('reset_token', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('reset_token_expiration', sa.DateTime(), nullable=True))
+        batch_op.create_unique_constraint('uq_user_reset_token', ['reset_token'])
@@ -0,0 +1,42 @@
+"""Add user product verdict table
+
+Revision ID: d9a4b7e2f815
+Revises: c3f7a2e91b54
+Create Date: 2026-10-19 16:48:13.907264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9a4b7e2f815'
+down_revision = 'c3f7a2e91b54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_product_verdict',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('verdict', sa.String(length=20), nullable=False),
+    sa.Column('explanation', sa.Text(), nullable=True),
+    sa.Column('allergy_version', sa.Integer(), nullable=False),
+    sa.Column('stale', sa.Boolean(), server_default=sa.false(), nullable=False),
+    sa.Column('checked_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], name='fk_verdict_product_id'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], name='fk_verdict_user_id'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'product_id', name='uq_user_product_verdict')
+    )
+    with op.batch_alter_table('user_product_verdict', schema=None) as batch_op:
+        batch_op.create_index('ix_user_product_verdict_stale', ['stale', 'user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_product_verdict', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_product_verdict_stale')
+
+    op.drop_table('user_product_verdict')
@@ -0,0 +1,34 @@
+"""Add unique (user_id, name) index on allergy
+
+Revision ID: e5c81f3a7b29
+Revises: d9a4b7e2f815
+Create Date: 2026-10-19 18:02:41.530118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c81f3a7b29'
+down_revision = 'd9a4b7e2f815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The model has always declared uq_user_allergy but the initial migration
+    # never created it, so drop any duplicates that slipped in before adding it.
+    op.execute(
+        "DELETE FROM allergy WHERE id NOT IN "
+        "(SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM allergy GROUP BY user_id, name) AS keep)"
+    )
+
+    # Also serves lookups by user_id alone, as its leading column.
+    with op.batch_alter_table('allergy', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_user_allergy', ['user_id', 'name'])
+
+
+def downgrade():
+    with op.batch_alter_table('allergy', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_user_allergy', type_='unique')
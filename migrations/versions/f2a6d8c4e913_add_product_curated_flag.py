@@ -0,0 +1,29 @@
+"""Add curated flag to product
+
+Revision ID: f2a6d8c4e913
+Revises: e5c81f3a7b29
+Create Date: 2026-10-20 10:14:52.318604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a6d8c4e913'
+down_revision = 'e5c81f3a7b29'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows are names users typed in, so they start out uncurated.
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('curated', sa.Boolean(), server_default=sa.false(), nullable=False))
+        batch_op.create_index('ix_product_curated', ['curated'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_curated')
+        batch_op.drop_column('curated')
@@ -1,5 +1,4 @@
-import secrets
-from datetime import datetime, timedelta
+from datetime import datetime
 from extensions import db
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -14,8 +13,7 @@ class User(db.Model, UserMixin):
     email = db.Column(db.String(120), unique=True, nullable=False)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
-    reset_token = db.Column(db.String(100), unique=True, nullable=True)
-    reset_token_expiration = db.Column(db.DateTime, nullable=True)
+    allergy_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     @property
     def is_active(self):
@@ -46,27 +44,6 @@ class User(db.Model, UserMixin):
         """
         return check_password_hash(self.password_hash, password)
 
-    def generate_reset_token(self):
-        """
-        Generates a secure token for password reset and sets its expiration time
-        to one hour from the current time.
-        """
-        self.reset_token = secrets.token_hex(16)
-        self.reset_token_expiration = datetime.utcnow() + timedelta(hours=1)
-
-    def validate_reset_token(self, token):
-        """
-        Validates the provided token by checking if it matches the stored token
-        and has not expired.
-
-        Args:
-            token (str): The reset token to validate.
-
-        Returns:
-            bool: True if the token is valid and not expired, False otherwise.
-        """
-        return self.reset_token == token and datetime.utcnow() < self.reset_token_expiration
-
 
 class Allergy(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -77,3 +54,62 @@ class Allergy(db.Model):
     __table_args__ = (
         db.UniqueConstraint('user_id', 'name', name='uq_user_allergy'),
     )
+
+
+class AllergyChange(db.Model):
+    """
+    Append-only log of allergy list changes, one row per added or removed name.
+    Each row carries the user's `allergy_version` after the change so clients
+    can ask for everything that happened since a version they already have.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', name="fk_allergy_change_user_id"), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    action = db.Column(db.String(10), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_allergy_change_user_version', 'user_id', 'version'),
+    )
+
+
+class Product(db.Model):
+    """
+    Canonical product names. `check_product` normalizes free-text names to
+    these before asking the AI, so case and spacing variants share one entry.
+    Only `curated` products are suggested to every user; the rest are names
+    users typed in and are private to the users who checked them.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), unique=True, nullable=False)
+    curated = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
+    __table_args__ = (
+        db.Index('ix_product_curated', 'curated'),
+    )
+
+
+class UserProductVerdict(db.Model):
+    """
+    Materialized AI safety verdict for a product a user has checked. Rows are
+    marked stale when the user's allergies change in a way that could flip the
+    verdict and are recomputed in the background; `refreshing_until` is the
+    lease a worker process takes on a stale row while it recomputes it.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', name="fk_verdict_user_id"), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id', name="fk_verdict_product_id"), nullable=False)
+    verdict = db.Column(db.String(20), nullable=False)
+    explanation = db.Column(db.Text, nullable=True)
+    allergy_version = db.Column(db.Integer, nullable=False)
+    stale = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    refreshing_until = db.Column(db.DateTime, nullable=True)
+    checked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'product_id', name='uq_user_product_verdict'),
+        db.Index('ix_user_product_verdict_stale', 'stale', 'user_id'),
+    )
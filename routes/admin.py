@@ -0,0 +1,119 @@
+"""
+Admin Blueprint for bulk user data migration.
+
+Routes:
+- GET /export : Stream all users and their allergies as NDJSON
+- POST /import: Import users and allergies from an NDJSON request body
+- GET /stats  : Product-check coalescing and cache counters of the serving process
+
+CLI (registered under `flask admin`):
+- flask admin export [FILE]
+- flask admin import FILE [--checkpoint PATH] [--chunk-size N] [--workers N]
+- flask admin seed-products FILE
+
+Admin access is granted to the user ids listed in the `ADMIN_USER_IDS` config value.
+"""
+
+import sys
+import click
+from functools import wraps
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from extensions import cache, db
+from utils.ai_processing import product_checks
+from utils.bulk_io import CHUNK_SIZE, export_users, import_users
+from utils.product_search import seed_products
+
+admin_bp = Blueprint("admin", __name__)
+
+def admin_required(f):
+    """Allow the request only if the JWT identity is in `ADMIN_USER_IDS`."""
+    @wraps(f)
+    @jwt_required()
+    def decorated(*args, **kwargs):
+        admin_ids = {str(i) for i in current_app.config.get("ADMIN_USER_IDS", [])}
+        if get_jwt_identity() not in admin_ids:
+            return jsonify({"message": "Admin access required"}), 403
+        return f(*args, **kwargs)
+    return decorated
+
+@admin_bp.route("/export", methods=["GET"])
+@admin_required
+def export_data():
+    """
+    Stream every user with their allergies, one JSON object per line.
+
+    Returns:
+        200 OK with an `application/x-ndjson` body.
+    """
+    return Response(stream_with_context(export_users()), mimetype="application/x-ndjson")
+
+@admin_bp.route("/stats", methods=["GET"])
+@admin_required
+def get_stats():
+    """
+    Counters of the worker process that serves the request: product checks in
+    flight and coalesced by the single-flight, and cache hits and misses per namespace.
+
+    Returns:
+        200 OK with `product_checks` and `cache` counters.
+    """
+    return jsonify({"product_checks": product_checks.stats(), "cache": cache.stats()}), 200
+
+@admin_bp.route("/import", methods=["POST"])
+@admin_required
+def import_data():
+    """
+    Import users and allergies from an NDJSON request body.
+
+    Each line looks like:
+        {"email": "...", "username": "...", "password": "..." | "password_hash": "...", "allergies": [...]}
+
+    Query Parameters:
+        skip (int, optional): Number of leading lines to skip, e.g. the `line`
+            value returned by an interrupted import.
+        chunk_size (int, optional): Records per transaction (default CHUNK_SIZE).
+
+    Returns:
+        200 OK with counts of imported, skipped and invalid records and the
+        number of lines committed.
+        400 Bad Request if skip is negative or chunk_size is less than 1.
+    """
+    skip = request.args.get("skip", 0, type=int)
+    chunk_size = request.args.get("chunk_size", CHUNK_SIZE, type=int)
+    if skip < 0 or chunk_size < 1:
+        return jsonify({"message": "skip must be >= 0 and chunk_size >= 1"}), 400
+
+    stats = import_users(request.stream, skip=skip, chunk_size=chunk_size)
+    return jsonify(stats), 200
+
+@admin_bp.cli.command("export")
+@click.argument("output", type=click.File("w"), default="-")
+def export_command(output):
+    """Write all users and allergies as NDJSON to OUTPUT (default stdout)."""
+    for line in export_users():
+        output.write(line)
+
+@admin_bp.cli.command("import")
+@click.argument("source", type=click.File("r"))
+@click.option("--checkpoint", type=click.Path(dir_okay=False), help="File recording committed lines, for resuming.")
+@click.option("--chunk-size", type=click.IntRange(min=1), default=CHUNK_SIZE, show_default=True,
+              help="Records per transaction.")
+@click.option("--workers", type=click.IntRange(min=1), default=None,
+              help="Password hashing processes (default: CPU count).")
+def import_command(source, checkpoint, chunk_size, workers):
+    """Import users and allergies from the NDJSON file SOURCE."""
+    stats = import_users(source, checkpoint=checkpoint, chunk_size=chunk_size, workers=workers)
+    click.echo(
+        f"Imported {stats['imported']}, skipped {stats['skipped']} existing, "
+        f"{stats['invalid']} invalid; committed through line {stats['line']}.",
+        file=sys.stderr,
+    )
+
+@admin_bp.cli.command("seed-products")
+@click.argument("source", type=click.File("r"))
+def seed_products_command(source):
+    """Mark the product names in SOURCE (one per line) as curated autocomplete suggestions."""
+    count = seed_products(source)
+    db.session.commit()
+    click.echo(f"Seeded {count} curated products.", file=sys.stderr)
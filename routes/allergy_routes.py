@@ -4,18 +4,21 @@ Allergy Management Blueprint for a Flask application.
 This module provides routes to manage user allergies, including:
 - Adding, editing, deleting, and listing allergies
 - Batch operations for allergy management
-- Uploading files (e.g., PDFs) to extract allergens via AI
+- Uploading files (e.g., PDFs) to extract allergens with the offline extractor
 - Checking product safety against known allergies using AI
 
 Routes:
-- GET /             : Get a list of user's allergies
+- GET /             : Get a list of user's allergies (paginated, ETag-aware, delta via ?since=)
 - POST /add         : Add a new allergy
 - PUT /edit         : Edit an existing allergy
 - DELETE /<name>    : Delete a specific allergy
 - POST /delete_batch: Delete multiple allergies at once
 - POST /add_batch   : Add multiple allergies at once
 - POST /check_product: Check if a product is safe based on allergies
-- POST /upload      : Upload a file to extract possible allergens
+- GET /products/search: Autocomplete product names (curated list plus the user's own)
+- GET /products     : Safety dashboard of the user's checked products
+- POST /upload      : Upload a file to extract possible allergens (no AI call)
+- POST /upload_label: OCR several photos of one product label and detect its allergens
 - POST /save        : Save selected extracted allergens to user's profile
 
 Dependencies:
@@ -23,21 +26,32 @@ Dependencies:
 - flask_jwt_extended
 - werkzeug
 - SQLAlchemy
-- Custom utility modules: `pdf_processing`, `ai_processing`
+- Custom utility modules: `pdf_processing`, `image_processing`, `ai_processing`,
+  `allergen_extraction`, `product_search`, `verdicts`
 """
 
-import os, re
-from flask import Blueprint, request, jsonify
+import os, re, hashlib, io, time
+from flask import Blueprint, abort, request, jsonify, make_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models.database import Allergy, User
-from utils.pdf_processing import extract_text_from_pdf, extract_allergens
-from utils.ai_processing import extract_allergens, check_product_safety
+from sqlalchemy.exc import IntegrityError
+from models.database import Allergy, AllergyChange, Product, User, UserProductVerdict
+from utils.pdf_processing import extract_text_from_pdf
+from utils.image_processing import extract_text_from_images, find_ingredients_section, merge_label_text
+from utils.ai_processing import check_product_safety, check_product_safety_async
+from utils.allergen_extraction import extract_allergens, extract_label_allergens, get_label_extractor
+from utils.product_search import normalize, product_index
+from utils.verdicts import get_fresh_verdict, mark_stale, save_verdict
 from extensions import db
 
 allergy_bp = Blueprint("allergy", __name__)
 
 UPLOAD_FOLDER = "uploads"
 ALLOWED_EXTENSIONS = {"pdf", "png", "jpg", "jpeg"}
+IMAGE_EXTENSIONS = {"png", "jpg", "jpeg"}
+MAX_LABEL_IMAGES = 8
+MAX_PAGE_SIZE = 500
+MAX_SEARCH_RESULTS = 50
+MAX_PRODUCT_NAME = Product.name.type.length
 
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
@@ -50,18 +64,137 @@ def is_valid_allergen(name):
     """Validate an allergen name using regex."""
     return bool(re.match(r"^[a-zA-Z\s\-]{2,50}$", name.strip()))
 
+def record_allergy_changes(user_id, added=(), removed=()):
+    """
+    Bump the user's allergy version, log the names that were added or removed and
+    mark the saved product verdicts the change could flip as stale.
+    Every mutation in this blueprint calls this before committing; the caller commits.
+
+    Returns:
+        int | None: The new version, or None if nothing changed.
+    """
+    if not added and not removed:
+        return None
+
+    user_id = int(user_id)
+    db.session.execute(
+        db.update(User)
+        .where(User.id == user_id)
+        .values(allergy_version=User.allergy_version + 1)
+    )
+    version = db.session.execute(
+        db.select(User.allergy_version).where(User.id == user_id)
+    ).scalar_one()
+
+    db.session.add_all(
+        [AllergyChange(user_id=user_id, version=version, name=n, action="add") for n in added]
+        + [AllergyChange(user_id=user_id, version=version, name=n, action="remove") for n in removed]
+    )
+    mark_stale(user_id, added=added, removed=removed)
+    return version
+
+def int_args(*names):
+    """
+    Read non-negative integer query parameters, None for those not given.
+
+    Raises:
+        ValueError: If a parameter is given but is not a non-negative integer.
+    """
+    values = []
+    for name in names:
+        raw = request.args.get(name)
+        if raw is not None and not (raw.isascii() and raw.isdigit()):
+            raise ValueError(f"{name} must be a non-negative integer")
+        values.append(None if raw is None else int(raw))
+    return values
+
+def get_allergy_version(user_id):
+    """Return the user's current allergy version without loading any allergy rows."""
+    version = db.session.execute(
+        db.select(User.allergy_version).where(User.id == int(user_id))
+    ).scalar()
+    return version or 0
+
 @allergy_bp.route("/", methods=["GET"])
 @jwt_required()
 def get_allergies():
     """
     Retrieve the list of allergies associated with the authenticated user.
 
+    Query Parameters:
+        limit (int, optional): Page size for keyset pagination (max 500).
+        cursor (int, optional): `next_cursor` from the previous page.
+        since (int, optional): Return only changes made after this version.
+
+    The response carries an ETag derived from the user's allergy version, so a
+    request with a matching `If-None-Match` header gets 304 without touching
+    the allergy table.
+
     Returns:
-        200 OK with a list of allergy names.
+        200 OK with a list of allergy names (or `added`/`removed` in delta mode).
+        304 Not Modified if the list has not changed.
+        400 Bad Request for invalid query parameters.
+        410 Gone if `since` is newer than the server's version.
     """
+    try:
+        since, limit, cursor = int_args("since", "limit", "cursor")
+    except ValueError as e:
+        return jsonify({"message": "Invalid query parameters", "details": str(e)}), 400
+    if limit is not None and limit < 1:
+        return jsonify({"message": "Invalid query parameters", "details": "limit must be at least 1"}), 400
+
     user_id = get_jwt_identity()
-    allergies = Allergy.query.filter_by(user_id=user_id).all()
-    return jsonify({"allergies": [a.name for a in allergies]}), 200
+    version = get_allergy_version(user_id)
+
+    etag = hashlib.sha1(f"{user_id}:{version}:{request.query_string.decode()}".encode()).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        response = make_response("", 304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    if since is not None:
+        if since > version:
+            return jsonify({"message": "Unknown version, reload the full list", "version": version}), 410
+
+        changes = db.session.execute(
+            db.select(AllergyChange.name, AllergyChange.action)
+            .where(AllergyChange.user_id == int(user_id), AllergyChange.version > since)
+            .order_by(AllergyChange.version, AllergyChange.id)
+        ).all()
+
+        latest = {}
+        for name, action in changes:
+            latest[name] = action
+
+        payload = {
+            "version": version,
+            "added": [n for n, action in latest.items() if action == "add"],
+            "removed": [n for n, action in latest.items() if action == "remove"],
+        }
+    else:
+        query = db.select(Allergy.id, Allergy.name).where(Allergy.user_id == int(user_id))
+        next_cursor = None
+
+        if limit is not None:
+            limit = min(limit, MAX_PAGE_SIZE)
+            rows = db.session.execute(
+                query.where(Allergy.id > (cursor or 0)).order_by(Allergy.id).limit(limit + 1)
+            ).all()
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = rows[-1].id
+        else:
+            rows = db.session.execute(query.order_by(Allergy.id)).all()
+
+        payload = {
+            "allergies": [row.name for row in rows],
+            "version": version,
+            "next_cursor": next_cursor,
+        }
+
+    response = make_response(jsonify(payload), 200)
+    response.set_etag(etag, weak=True)
+    return response
 
 @allergy_bp.route("/add", methods=["POST"])
 @jwt_required()
@@ -92,6 +225,7 @@ def add_allergy():
 
     new_allergy = Allergy(name=allergy_name, user_id=user_id)
     db.session.add(new_allergy)
+    record_allergy_changes(user_id, added=[allergy_name])
     db.session.commit()
 
     return jsonify({"message": "Allergy added successfully"}), 200
@@ -110,7 +244,9 @@ def edit_allergy():
 
     Returns:
         200 OK if updated.
+        400 Bad Request for an invalid new name.
         404 Not Found if allergy not found.
+        409 Conflict if the user already has an allergy with the new name.
     """
     data = request.get_json()
     user_id = get_jwt_identity()
@@ -121,8 +257,22 @@ def edit_allergy():
     if not allergy:
         return jsonify({"message": "Allergy not found"}), 404
 
-    allergy.name = new_name
-    db.session.commit()
+    if not new_name or not re.match(r'^[a-zA-Z\s\-]+$', new_name):
+        return jsonify({"message": "Invalid allergy name"}), 400
+
+    if new_name != old_name:
+        existing = Allergy.query.filter_by(user_id=user_id, name=new_name).first()
+        if existing:
+            return jsonify({"message": "Allergy already exists"}), 409
+
+        allergy.name = new_name
+        record_allergy_changes(user_id, added=[new_name], removed=[old_name])
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another request added the same name after the check above.
+        db.session.rollback()
+        return jsonify({"message": "Allergy already exists"}), 409
     return jsonify({"message": "Allergy updated"}), 200
 
 @allergy_bp.route("/<string:allergy_name>", methods=["DELETE"])
@@ -146,6 +296,7 @@ def delete_allergy(allergy_name):
         return jsonify({"message": "Allergy not found"}), 404
 
     db.session.delete(allergy)
+    record_allergy_changes(user_id, removed=[normalized_name])
     db.session.commit()
     return jsonify({"message": f"Allergy '{normalized_name}' deleted."}), 200
 
@@ -178,6 +329,7 @@ def delete_allergies():
             db.session.delete(allergy)
             deleted.append(name)
 
+    record_allergy_changes(user_id, removed=[a.strip().lower() for a in deleted])
     db.session.commit()
     return jsonify({"message": "Deleted", "deleted": deleted}), 200
 
@@ -186,6 +338,9 @@ def delete_allergies():
 def check_product():
     """
     Use AI to check if a product is safe based on user's allergies.
+    The product name is normalized (case and whitespace) and registered in the
+    product table, so repeat checks share one AI call. A stored verdict
+    that is still valid for the user's allergies is returned without an AI call.
 
     JSON Body:
         {
@@ -194,29 +349,135 @@ def check_product():
 
     Returns:
         200 OK with AI response.
-        400 Bad Request if product name is missing.
+        400 Bad Request if product name is missing or too long.
         500 Internal Server Error if AI call fails.
     """
+    user_id, product_name, response, user_allergies, version = start_product_check()
+    if response is None:
+        try:
+            response = check_product_safety(product_name, user_allergies)
+        except Exception as e:
+            return jsonify({"error": "AI check failed", "details": str(e)}), 500
+        finish_product_check(user_id, product_name, response, version)
+    return jsonify({"message": response, "product": product_name}), 200
+
+async def check_product_async(call):
+    """
+    Coroutine version of `check_product`, served by `asgi.py` in ASGI mode.
+    Each database step runs through `call.run` on the server's thread pool in
+    a Flask request context; the AI call is awaited, so no thread is held
+    while it is in flight.
+    """
+    check = await call.run(jwt_required()(start_product_check))
+    user_id, product_name, response, user_allergies, version = check
+    if response is None:
+        try:
+            response = await check_product_safety_async(product_name, user_allergies)
+        except Exception as e:
+            return {"error": "AI check failed", "details": str(e)}, 500
+        await call.run(finish_product_check, user_id, product_name, response, version)
+    return {"message": response, "product": product_name}, 200
+
+def start_product_check():
+    """
+    Read the product name from the request, look up its stored verdict and
+    commit the product if it is new, so no transaction stays open during the AI call.
+    Aborts with 400 if the name is missing or longer than a product name can be.
+
+    Returns:
+        tuple: (user id, canonical name, stored verdict or None, user's
+        allergies, allergy version)
+    """
     user_id = get_jwt_identity()
     data = request.get_json()
     product_name = data.get("product_name", "").strip().lower()
-
     if not product_name:
-        return jsonify({"error": "Missing product name"}), 400
+        abort(make_response(jsonify({"error": "Missing product name"}), 400))
+    if len(normalize(product_name)) > MAX_PRODUCT_NAME:
+        abort(make_response(jsonify({"error": f"Product name is longer than {MAX_PRODUCT_NAME} characters"}), 400))
 
+    check = (user_id,) + begin_product_check(user_id, product_name)
+    db.session.commit()
+    return check
+
+def begin_product_check(user_id, product_name):
+    """
+    Resolve a product name and look up its stored verdict for the user. Caller commits.
+
+    Returns:
+        tuple: (canonical name, stored verdict or None, user's allergies, allergy version)
+    """
+    product_name = product_index.resolve(product_name)
+    response = get_fresh_verdict(user_id, product_name)
+    if response is not None:
+        return product_name, response, None, None
+
+    version = get_allergy_version(user_id)
     user_allergies = [a.name for a in Allergy.query.filter_by(user_id=user_id).all()]
+    return product_name, None, user_allergies, version
 
-    try:
-        response = check_product_safety(product_name, user_allergies)
-        return jsonify({"message": response}), 200
-    except Exception as e:
-        return jsonify({"error": "AI check failed", "details": str(e)}), 500
+def finish_product_check(user_id, product_name, response, version):
+    """Store a fresh AI verdict unless it failed or the allergies changed meanwhile."""
+    if response[0] != "Error" and get_allergy_version(user_id) == version:
+        save_verdict(user_id, product_name, *response, allergy_version=version)
+        db.session.commit()
+
+@allergy_bp.route("/products", methods=["GET"])
+@jwt_required()
+def get_product_verdicts():
+    """
+    Safety dashboard of every product the user has checked, read from the
+    materialized verdict table in one indexed query.
+
+    Returns:
+        200 OK with a list of products, their verdicts and whether a recompute is pending.
+    """
+    user_id = get_jwt_identity()
+    rows = db.session.execute(
+        db.select(
+            Product.name,
+            UserProductVerdict.verdict,
+            UserProductVerdict.explanation,
+            UserProductVerdict.stale,
+            UserProductVerdict.checked_at,
+        )
+        .join(Product, Product.id == UserProductVerdict.product_id)
+        .where(UserProductVerdict.user_id == int(user_id))
+        .order_by(Product.name)
+    ).all()
+
+    return jsonify({"products": [{
+        "product": row.name,
+        "verdict": row.verdict,
+        "explanation": row.explanation,
+        "pending": row.stale,
+        "checked_at": row.checked_at.isoformat(),
+    } for row in rows]}), 200
+
+@allergy_bp.route("/products/search", methods=["GET"])
+@jwt_required()
+def search_products():
+    """
+    Autocomplete product names from the curated product list and the
+    products the user has checked before.
+
+    Query Parameters:
+        q (str): Partial or misspelled product name.
+        limit (int, optional): Maximum number of results (default 10, max 50).
+
+    Returns:
+        200 OK with a list of matching canonical product names.
+    """
+    query = request.args.get("q", "")
+    limit = min(max(request.args.get("limit", 10, type=int), 1), MAX_SEARCH_RESULTS)
+    return jsonify({"products": product_index.search(query, limit, user_id=get_jwt_identity())}), 200
 
 @allergy_bp.route("/upload", methods=["POST"])
 @jwt_required()
 def upload_file():
     """
-    Upload a PDF file and extract possible allergens using AI.
+    Upload a PDF file and extract possible allergens with the offline
+    lexicon-and-rules extractor, without any AI call.
 
     Form-Data:
         file: A file (PDF, JPG, PNG, JPEG)
@@ -245,6 +506,70 @@ def upload_file():
     except Exception as e:
         return jsonify({"message": f"Error processing file: {str(e)}"}), 500
 
+@allergy_bp.route("/upload_label", methods=["POST"])
+@jwt_required()
+def upload_label():
+    """
+    OCR several photos of one product label in a single request and detect
+    allergens in the combined ingredient list.
+
+    The images are OCR'd in parallel, their text is merged with lines repeated
+    across photos removed, and allergen detection runs once on the ingredients
+    section of the merged text.
+
+    Form-Data:
+        files: Up to MAX_LABEL_IMAGES images (JPG, PNG, JPEG), in label order
+
+    Returns:
+        200 OK with the detected allergens, those matching the user's allergies,
+            the ingredients text and per image the OCR timing and any OCR error.
+        400 Bad Request if no images, too many images or a non-image file is sent.
+        422 Unprocessable Entity if none of the images could be OCR'd.
+        500 Internal Server Error on processing failure.
+    """
+    files = [f for f in request.files.getlist("files") if f.filename]
+    if not files:
+        return jsonify({"message": "No images provided"}), 400
+    if len(files) > MAX_LABEL_IMAGES:
+        return jsonify({"message": f"At most {MAX_LABEL_IMAGES} images per label"}), 400
+
+    for file in files:
+        if "." not in file.filename or file.filename.rsplit(".", 1)[1].lower() not in IMAGE_EXTENSIONS:
+            return jsonify({"message": f"Unsupported image: {file.filename}"}), 400
+
+    try:
+        start = time.perf_counter()
+        images = [io.BytesIO(file.read()) for file in files]
+        results = extract_text_from_images(images)
+        ocr_ms = (time.perf_counter() - start) * 1000
+
+        images = [
+            {"filename": file.filename, "characters": len(text), "ocr_ms": round(seconds * 1000, 1), "error": error}
+            for file, (text, seconds, error) in zip(files, results)
+        ]
+        if all(error for _, _, error in results):
+            return jsonify({"message": "None of the images could be read", "images": images}), 422
+
+        ingredients = find_ingredients_section(merge_label_text([text for text, _, _ in results]))
+        allergens = extract_label_allergens(ingredients)
+
+        canonical = get_label_extractor().canonical
+        user_allergies = db.session.execute(
+            db.select(Allergy.name).where(Allergy.user_id == get_jwt_identity())
+        ).scalars().all()
+        user_allergens = {canonical.get(name.lower(), name.lower()) for name in user_allergies}
+
+        return jsonify({
+            "allergens": allergens,
+            "matches": [name for name in allergens if name in user_allergens],
+            "ingredients": ingredients,
+            "images": images,
+            "ocr_ms": round(ocr_ms, 1),
+        }), 200
+
+    except Exception as e:
+        return jsonify({"message": f"Error processing images: {str(e)}"}), 500
+
 @allergy_bp.route("/save", methods=["POST"])
 @jwt_required()
 def save_selected_allergies():
@@ -267,11 +592,16 @@ def save_selected_allergies():
     if not selected_allergies:
         return jsonify({"message": "No allergies submitted"}), 400
 
-    user = User.query.get(user_id)
-    for a in selected_allergies:
-        if a not in user.allergies:
-            user.allergies.append(a)
+    existing = {a.name for a in Allergy.query.filter_by(user_id=user_id).all()}
+
+    added = []
+    for name in selected_allergies:
+        normalized = name.strip().lower()
+        if normalized and normalized not in existing and normalized not in added:
+            db.session.add(Allergy(name=normalized, user_id=user_id))
+            added.append(normalized)
 
+    record_allergy_changes(user_id, added=added)
     db.session.commit()
     return jsonify({"message": "Allergies saved successfully."}), 200
 
@@ -302,9 +632,10 @@ def add_batch_allergies():
     added = []
     for name in allergy_list:
         normalized = name.strip().lower()
-        if normalized and normalized not in existing:
+        if normalized and normalized not in existing and normalized not in added:
             db.session.add(Allergy(name=normalized, user_id=user_id))
             added.append(normalized)
 
+    record_allergy_changes(user_id, added=added)
     db.session.commit()
     return jsonify({"message": f"Added {len(added)} new allergies.", "added": added}), 200
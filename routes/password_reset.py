@@ -1,26 +1,111 @@
-from flask import Blueprint, request, render_template, redirect, url_for, flash
+import hashlib
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, current_app, request, render_template, redirect, url_for, flash
 from itsdangerous import SignatureExpired, BadSignature
-from extensions import mail, get_serializer
+from extensions import mail, cache, get_serializer
 from flask_mail import Message
 from models.database import User
 from extensions import db
 
 password_reset = Blueprint("password_reset", __name__)
 
+RESET_SALT = "password-reset-salt"
+RESET_MAX_AGE = 3600
+
+used_nonces = cache.namespace("reset_nonces", ttl=RESET_MAX_AGE)
+
+
+def password_fingerprint(password_hash):
+    """Short digest of the stored hash; tokens stop validating once the password changes."""
+    return hashlib.sha256(password_hash.encode()).hexdigest()[:16]
+
+
+class MailPool:
+    """Worker pool that sends emails for one app, with a cap on how many may wait."""
+
+    def __init__(self, app):
+        self.app = app
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config.get("MAIL_WORKERS", 2), thread_name_prefix="mail"
+        )
+        self.slots = threading.BoundedSemaphore(app.config.get("MAIL_MAX_PENDING", 100))
+
+    def submit(self, msg):
+        """Queue `msg`; return False without queueing if the pool is full."""
+        if not self.slots.acquire(blocking=False):
+            return False
+        self.executor.submit(self._send, msg)
+        return True
+
+    def _send(self, msg):
+        try:
+            with self.app.app_context():
+                mail.send(msg)
+        except Exception:
+            self.app.logger.exception("Error sending email to %s", ", ".join(msg.recipients))
+        finally:
+            self.slots.release()
+
+
+def send_mail(msg):
+    """
+    Send an email. It is sent inline unless `MAIL_SEND_ASYNC = True`, in which case
+    it goes to a pool of `MAIL_WORKERS` threads so the request does not wait on SMTP;
+    failures there are logged with the app logger. Once `MAIL_MAX_PENDING` emails
+    are waiting, further ones are sent inline.
+    """
+    app = current_app._get_current_object()
+    if app.config.get("MAIL_SEND_ASYNC", False):
+        pool = app.extensions.get("mail_pool")
+        if pool is None:
+            pool = app.extensions.setdefault("mail_pool", MailPool(app))
+        if pool.submit(msg):
+            return
+    mail.send(msg)
+
+
+def load_reset_token(token):
+    """
+    Verify a reset token without touching the database.
+
+    Returns:
+        tuple: (user_id, nonce, fingerprint), or None after flashing the reason.
+    """
+    try:
+        user_id, nonce, fingerprint = get_serializer().loads(token, salt=RESET_SALT, max_age=RESET_MAX_AGE)
+    except SignatureExpired:
+        flash("The token has expired.", "danger")
+        return None
+    except (BadSignature, ValueError, TypeError):
+        flash("Invalid token.", "danger")
+        return None
+
+    if used_nonces.get(nonce):
+        flash("This reset link has already been used.", "danger")
+        return None
+    return user_id, nonce, fingerprint
+
+
 @password_reset.route("/reset", methods=["GET", "POST"])
 def reset_request():
     if request.method == "POST":
         email = request.form.get("email")
-        user = User.query.filter_by(email=email).first()
+        user = db.session.execute(
+            db.select(User.id, User.password_hash).where(User.email == email)
+        ).first()
 
         if user:
-            serializer = get_serializer()
-            token = serializer.dumps(email, salt="password-reset-salt")
+            token = get_serializer().dumps(
+                [user.id, secrets.token_urlsafe(8), password_fingerprint(user.password_hash)],
+                salt=RESET_SALT,
+            )
             reset_url = url_for("password_reset.reset_token", token=token, _external=True)
             
             msg = Message("Password Reset Request", recipients=[email])
             msg.body = f"Click the link to reset your password: {reset_url}"
-            mail.send(msg)
+            send_mail(msg)
 
             flash("Check your email for a password reset link.", "info")
         else:
@@ -33,26 +118,22 @@ def reset_request():
 
 @password_reset.route("/reset_token/<token>", methods=["GET", "POST"])
 def reset_token(token):
-    try:
-        serializer = get_serializer()
-        email = serializer.loads(token, salt="password-reset-salt", max_age=3600)
-    except SignatureExpired:
-        flash("The token has expired.", "danger")
-        return redirect(url_for("password_reset.reset_request"))
-    except BadSignature:
-        flash("Invalid token.", "danger")
+    payload = load_reset_token(token)
+    if payload is None:
         return redirect(url_for("password_reset.reset_request"))
 
-    user = User.query.filter_by(email=email).first()
+    if request.method == "POST":
+        user_id, nonce, fingerprint = payload
+        user = db.session.get(User, user_id)
 
-    if not user:
-        flash("User not found.", "danger")
-        return redirect(url_for("password_reset.reset_request"))
+        if not user or password_fingerprint(user.password_hash) != fingerprint:
+            flash("Invalid token.", "danger")
+            return redirect(url_for("password_reset.reset_request"))
 
-    if request.method == "POST":
         new_password = request.form.get("password")
         user.set_password(new_password) 
         db.session.commit()
+        used_nonces.set(nonce, True)
         flash("Your password has been updated!", "success")
         return redirect(url_for("auth.login"))
 
@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import config  # noqa: F401
+except ImportError:
+    # config.py holds deployment secrets and is not checked in; tests pass
+    # everything they need to create_app() instead.
+    config = types.ModuleType("config")
+    config.Config = type("Config", (), {"GEMINI_API_KEY": "test"})
+    sys.modules["config"] = config
+
+from app import create_app
+from extensions import db
+from flask_jwt_extended import create_access_token
+from models.database import User
+from utils.ai_processing import product_checks
+from utils.product_search import product_index
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SECRET_KEY": "test",
+        "JWT_SECRET_KEY": "test-jwt-secret-key-of-at-least-32-bytes",
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+        "MAIL_SUPPRESS_SEND": True,
+        "MAIL_DEFAULT_SENDER": "test@example.com",
+        "VERDICT_REFRESH_ENABLED": False,
+        "CACHE_BACKEND": "lru",
+    })
+    product_index.__init__()
+    product_checks.reset()
+
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Create a user and return (user_id, Authorization headers)."""
+    def make(username="alice"):
+        with app.app_context():
+            user = User(email=f"{username}@example.com", username=username, password_hash="x")
+            db.session.add(user)
+            db.session.commit()
+            return user.id, {"Authorization": f"Bearer {create_access_token(identity=user.id)}"}
+    return make
+
+
+@pytest.fixture
+def fake_ai(monkeypatch):
+    """
+    Replace the Gemini call with a stand-in. Set `fake_ai.latency` to make it slow;
+    `fake_ai.calls` records the products checked.
+    """
+    import utils.ai_processing as ai_processing
+
+    fake = types.SimpleNamespace(calls=[], latency=0.0)
+
+    def check(product_name, user_allergies):
+        fake.calls.append(product_name)
+        time.sleep(fake.latency)
+        return "Safe", "Stand-in verdict."
+
+    monkeypatch.setattr(ai_processing, "_check_product_safety", check)
+    return fake
@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+
+import pytest
+
+import utils.ai_processing as ai_processing
+from utils.ai_processing import ModelClientManager, clients
+
+
+@pytest.fixture
+def built(monkeypatch):
+    """Replace GenerativeModel with a slow stand-in; returns the list of handles built."""
+    built = []
+
+    class Model:
+        def __init__(self, name):
+            time.sleep(0.01)
+            self.name = name
+            built.append(self)
+
+    monkeypatch.setattr(ai_processing.genai, "GenerativeModel", Model)
+    return built
+
+
+def test_threads_share_one_handle_per_model(built):
+    manager = ModelClientManager()
+    barrier = threading.Barrier(8)
+    handles = []
+
+    def get():
+        barrier.wait()
+        handles.append(manager.get())
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1
+    assert all(handle is built[0] for handle in handles)
+    assert manager.get("other-model") is not built[0]
+    assert len(built) == 2
+
+
+def test_handles_are_rebuilt_in_another_process(built, monkeypatch):
+    manager = ModelClientManager()
+    first = manager.get()
+    configured = []
+    monkeypatch.setattr(ai_processing, "configure_genai", lambda: configured.append(os.getpid()))
+
+    manager._pid = -1  # as seen from a forked child
+    second = manager.get()
+
+    assert second is not first
+    assert configured == [os.getpid()]
+    assert manager.get() is second
+
+
+def test_default_transport_is_the_sdk_default(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ai_processing.genai, "configure", lambda **kwargs: calls.append(kwargs))
+
+    ai_processing.configure_genai()
+
+    assert calls[0]["transport"] is None
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_fork_hook_drops_the_parents_handles(monkeypatch):
+    monkeypatch.setattr(clients, "_warm_after_fork", False)
+    parent = clients.get()
+    read_end, write_end = os.pipe()
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            ok = clients._pid == os.getpid() and clients._models == {} and clients.get() is not parent
+            os.write(write_end, b"1" if ok else b"0")
+        finally:
+            os._exit(0)
+
+    os.close(write_end)
+    result = os.read(read_end, 1)
+    os.waitpid(pid, 0)
+    os.close(read_end)
+
+    assert result == b"1"
+    assert clients.get() is parent
@@ -0,0 +1,47 @@
+import json
+import os
+
+import pytest
+
+from utils.allergen_extraction import extract_allergens, extract_label_allergens
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return [pytest.param(r["text"], r["allergens"], id=r["text"].splitlines()[0][:40]) for r in json.load(f)]
+
+
+@pytest.mark.parametrize("text, expected", load("lab_reports.json"))
+def test_lab_reports(text, expected):
+    assert sorted(extract_allergens(text)) == sorted(expected)
+
+
+@pytest.mark.parametrize("text, expected", load("food_labels.json"))
+def test_food_labels(text, expected):
+    assert sorted(extract_label_allergens(text)) == sorted(expected)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Gluten free oats", []),
+    ("Dairy free", []),
+    ("Gluten-free oats, milk", ["milk"]),
+    ("Egg-free, contains milk", ["milk"]),
+    ("Free from milk, eggs and peanuts", []),
+    ("Does not contain peanuts", []),
+    ("May contain traces of peanuts", ["peanut"]),
+])
+def test_label_negative_cues(text, expected):
+    assert extract_label_allergens(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Allergic to eggs but not milk", ["egg"]),
+    ("Allergic to eggs, not milk", ["egg"]),
+    ("Not allergic to peanuts", []),
+    ("Patient lives with two dogs", []),
+    ("Positive for dog dander", ["dog dander"]),
+])
+def test_report_negation_and_pets(text, expected):
+    assert extract_allergens(text) == expected
@@ -0,0 +1,260 @@
+import io
+
+import pytest
+
+import utils.image_processing as image_processing
+
+
+def add(client, headers, *names):
+    for name in names:
+        assert client.post("/allergy/add", json={"allergy": name}, headers=headers).status_code == 200
+
+
+def allergies(client, headers):
+    return sorted(client.get("/allergy/", headers=headers).get_json()["allergies"])
+
+
+def get(client, headers, **params):
+    return client.get("/allergy/", query_string=params, headers=headers)
+
+
+def test_pages_follow_next_cursor_to_the_end(client, make_user):
+    _, headers = make_user()
+    names = ["peanuts", "milk", "soy", "egg", "wheat"]
+    add(client, headers, *names)
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2} if cursor is None else {"limit": 2, "cursor": cursor}
+        data = get(client, headers, **params).get_json()
+        pages.append(data["allergies"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == [["peanuts", "milk"], ["soy", "egg"], ["wheat"]]
+
+
+def test_exactly_full_last_page_has_no_next_cursor(client, make_user):
+    _, headers = make_user()
+    add(client, headers, "peanuts", "milk")
+
+    data = get(client, headers, limit=2).get_json()
+
+    assert data["allergies"] == ["peanuts", "milk"]
+    assert data["next_cursor"] is None
+
+
+@pytest.mark.parametrize("params", [
+    {"limit": "abc"}, {"limit": "0"}, {"limit": "-1"}, {"limit": "1.5"},
+    {"cursor": "abc"}, {"cursor": "-3"}, {"limit": "2", "cursor": "x"},
+    {"since": "abc"}, {"since": "-1"}, {"since": ""},
+])
+def test_invalid_query_parameters_are_rejected(client, make_user, params):
+    _, headers = make_user()
+    add(client, headers, "peanuts")
+
+    response = get(client, headers, **params)
+
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "Invalid query parameters"
+
+
+def test_unchanged_list_returns_304_until_it_changes(client, make_user):
+    _, headers = make_user()
+    add(client, headers, "peanuts")
+
+    first = get(client, headers)
+    etag = first.headers["ETag"]
+    cached = client.get("/allergy/", headers=dict(headers, **{"If-None-Match": etag}))
+    add(client, headers, "milk")
+    changed = client.get("/allergy/", headers=dict(headers, **{"If-None-Match": etag}))
+
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.get_json()["allergies"] == ["peanuts", "milk"]
+
+
+def test_etag_depends_on_query_parameters(client, make_user):
+    _, headers = make_user()
+    add(client, headers, "peanuts", "milk")
+    etag = get(client, headers).headers["ETag"]
+
+    response = client.get("/allergy/?limit=1", headers=dict(headers, **{"If-None-Match": etag}))
+
+    assert response.status_code == 200
+    assert response.get_json()["allergies"] == ["peanuts"]
+
+
+def test_since_returns_changes_after_a_version(client, make_user):
+    _, headers = make_user()
+    add(client, headers, "peanuts", "milk")
+    version = get(client, headers).get_json()["version"]
+
+    add(client, headers, "soy")
+    client.delete("/allergy/milk", headers=headers)
+    client.put("/allergy/edit", json={"old_name": "peanuts", "new_name": "tree nuts"}, headers=headers)
+    add(client, headers, "milk")
+    data = get(client, headers, since=version).get_json()
+
+    assert data["version"] == version + 4
+    assert sorted(data["added"]) == ["milk", "soy", "tree nuts"]
+    assert data["removed"] == ["peanuts"]
+    assert get(client, headers, since=data["version"]).get_json() == {
+        "version": data["version"], "added": [], "removed": [],
+    }
+
+
+def test_since_newer_than_server_version_is_gone(client, make_user):
+    _, headers = make_user()
+    add(client, headers, "peanuts")
+
+    response = get(client, headers, since=99)
+
+    assert response.status_code == 410
+    assert response.get_json()["version"] == 1
+
+
+def test_versions_are_per_user(client, make_user):
+    _, alice = make_user("alice")
+    _, bob = make_user("bob")
+    add(client, alice, "peanuts", "milk")
+
+    assert get(client, bob).get_json()["version"] == 0
+    assert get(client, alice).get_json()["version"] == 2
+
+
+@pytest.mark.parametrize("method, path, body, added, removed", [
+    ("post", "/allergy/add", {"allergy": "soy"}, ["soy"], []),
+    ("put", "/allergy/edit", {"old_name": "milk", "new_name": "soy"}, ["soy"], ["milk"]),
+    ("delete", "/allergy/milk", None, [], ["milk"]),
+    ("post", "/allergy/delete_batch", {"allergies": ["milk", "peanuts"]}, [], ["milk", "peanuts"]),
+    ("post", "/allergy/save", {"allergies": ["soy", "milk"]}, ["soy"], []),
+    ("post", "/allergy/add_batch", {"allergies": ["soy", "egg"]}, ["soy", "egg"], []),
+])
+def test_each_mutation_bumps_the_version_once(client, make_user, method, path, body, added, removed):
+    _, headers = make_user()
+    add(client, headers, "peanuts", "milk")
+    before = get(client, headers)
+
+    response = getattr(client, method)(path, json=body, headers=headers)
+    after = get(client, headers, since=before.get_json()["version"]).get_json()
+
+    assert response.status_code == 200
+    assert after["version"] == before.get_json()["version"] + 1
+    assert (sorted(after["added"]), sorted(after["removed"])) == (sorted(added), sorted(removed))
+    assert client.get("/allergy/", headers=dict(headers, **{"If-None-Match": before.headers["ETag"]})).status_code == 200
+
+
+@pytest.mark.parametrize("method, path, body", [
+    ("put", "/allergy/edit", {"old_name": "milk", "new_name": "milk"}),
+    ("delete", "/allergy/soy", None),
+    ("post", "/allergy/save", {"allergies": ["milk"]}),
+    ("post", "/allergy/add_batch", {"allergies": ["peanuts"]}),
+])
+def test_mutations_that_change_nothing_keep_the_version(client, make_user, method, path, body):
+    _, headers = make_user()
+    add(client, headers, "peanuts", "milk")
+    etag = get(client, headers).headers["ETag"]
+
+    getattr(client, method)(path, json=body, headers=headers)
+
+    assert client.get("/allergy/", headers=dict(headers, **{"If-None-Match": etag})).status_code == 304
+
+
+def test_edit_renames_allergy(client, make_user):
+    _, headers = make_user()
+    add(client, headers, "peanuts")
+
+    response = client.put("/allergy/edit", json={"old_name": "Peanuts", "new_name": " Tree Nuts "}, headers=headers)
+
+    assert response.status_code == 200
+    assert allergies(client, headers) == ["tree nuts"]
+
+
+def test_edit_to_existing_name_is_a_conflict(client, make_user):
+    _, headers = make_user()
+    add(client, headers, "peanuts", "milk")
+
+    response = client.put("/allergy/edit", json={"old_name": "peanuts", "new_name": "milk"}, headers=headers)
+
+    assert response.status_code == 409
+    assert response.get_json() == {"message": "Allergy already exists"}
+    assert allergies(client, headers) == ["milk", "peanuts"]
+
+
+def test_edit_to_another_users_name_is_allowed(client, make_user):
+    _, alice = make_user("alice")
+    _, bob = make_user("bob")
+    add(client, alice, "milk")
+    add(client, bob, "peanuts")
+
+    response = client.put("/allergy/edit", json={"old_name": "peanuts", "new_name": "milk"}, headers=bob)
+
+    assert response.status_code == 200
+    assert allergies(client, bob) == ["milk"]
+
+
+def test_edit_rejects_invalid_new_name(client, make_user):
+    _, headers = make_user()
+    add(client, headers, "peanuts")
+
+    for new_name in ["", "   ", "nuts; drop table"]:
+        response = client.put("/allergy/edit", json={"old_name": "peanuts", "new_name": new_name}, headers=headers)
+        assert response.status_code == 400
+
+    assert allergies(client, headers) == ["peanuts"]
+
+
+def upload_label(client, headers, *images):
+    files = [(io.BytesIO(content), name) for name, content in images]
+    return client.post("/allergy/upload_label", data={"files": files}, headers=headers, content_type="multipart/form-data")
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    """OCR that returns the image bytes as text, and fails for images starting with b"!"."""
+    def ocr(image):
+        content = image.read()
+        if content.startswith(b"!"):
+            raise RuntimeError("tesseract exited with status 1")
+        return content.decode()
+
+    monkeypatch.setattr(image_processing, "extract_text_from_image", ocr)
+
+
+def test_upload_label_honours_free_from_statements(client, make_user, fake_ocr):
+    _, headers = make_user()
+    add(client, headers, "milk", "wheat")
+
+    response = upload_label(
+        client, headers,
+        ("front.png", b"Oat bar"),
+        ("back.png", b"Ingredients: gluten-free oats, milk chocolate (sugar, cocoa butter, milk powder)"),
+    )
+
+    assert response.status_code == 200
+    assert response.get_json()["allergens"] == ["milk"]
+    assert response.get_json()["matches"] == ["milk"]
+
+
+def test_upload_label_reports_images_that_failed_ocr(client, make_user, fake_ocr):
+    _, headers = make_user()
+
+    response = upload_label(client, headers, ("front.png", b"!"), ("back.png", b"Contains: peanuts"))
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["allergens"] == ["peanut"]
+    assert [image["error"] for image in data["images"]] == ["OCR failed: tesseract exited with status 1", None]
+
+
+def test_upload_label_fails_when_no_image_could_be_read(client, make_user, fake_ocr):
+    _, headers = make_user()
+
+    response = upload_label(client, headers, ("front.png", b"!"), ("back.png", b"!"))
+
+    assert response.status_code == 422
+    assert [image["filename"] for image in response.get_json()["images"]] == ["front.png", "back.png"]
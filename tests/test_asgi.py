@@ -0,0 +1,147 @@
+import asyncio
+import json
+
+import pytest
+
+import utils.ai_processing as ai_processing
+from routes.allergy_routes import check_product_async
+from utils.asgi import AsgiServer
+
+CHECK_PRODUCT = ("POST", "/allergy/check_product")
+
+
+def asgi_request(server, method, path, body=b"", headers=None, chunks=None):
+    """Send one HTTP request straight to an ASGI app; return (status, headers, body)."""
+    async def run():
+        messages = []
+        pending = list(chunks) if chunks is not None else [body]
+
+        async def receive():
+            if pending:
+                chunk = pending.pop(0)
+                return {"type": "http.request", "body": chunk, "more_body": bool(pending)}
+            await asyncio.sleep(3600)
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http",
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "root_path": "",
+            "query_string": b"",
+            "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+            "server": ("testserver", 80),
+            "client": ("127.0.0.1", 50000),
+        }
+        await server(scope, receive, send)
+        return messages
+
+    messages = asyncio.run(run())
+    start = messages[0]
+    response_headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    return start["status"], response_headers, b"".join(m.get("body", b"") for m in messages[1:])
+
+
+@pytest.fixture
+def server(app):
+    server = AsgiServer(app, {CHECK_PRODUCT: check_product_async})
+    yield server
+    server.executor.shutdown()
+
+
+@pytest.fixture
+def fake_ai_async(monkeypatch):
+    calls = []
+
+    async def check(product_name, user_allergies):
+        calls.append(product_name)
+        await asyncio.sleep(0)
+        return "Safe", "Stand-in verdict."
+
+    monkeypatch.setattr(ai_processing, "_check_product_safety_async", check)
+    return calls
+
+
+def post_check(server, headers, body=None, **kwargs):
+    body = json.dumps(body if body is not None else {"product_name": "Choc Bar"}).encode()
+    return asgi_request(server, *CHECK_PRODUCT, body, dict({"Content-Type": "application/json"}, **headers), **kwargs)
+
+
+def test_native_route_checks_product_with_flask_cors(server, make_user, fake_ai_async):
+    _, headers = make_user()
+
+    status, response_headers, body = post_check(server, dict(headers, Origin="https://app.example.com"))
+
+    assert status == 200
+    assert json.loads(body) == {"message": ["Safe", "Stand-in verdict."], "product": "choc bar"}
+    assert response_headers["access-control-allow-origin"] == "https://app.example.com"
+    assert fake_ai_async == ["choc bar"]
+
+
+def test_native_route_applies_flask_jwt_extended_settings(app, server, make_user, fake_ai_async):
+    _, headers = make_user()
+    app.extensions["flask-jwt-extended"].token_in_blocklist_loader(lambda header, payload: True)
+
+    status, _, body = post_check(server, headers)
+
+    assert status == 401
+    assert json.loads(body) == {"msg": "Token has been revoked"}
+    assert fake_ai_async == []
+
+
+def test_native_route_requires_token(server, fake_ai_async):
+    status, _, body = post_check(server, {})
+
+    assert status == 401
+    assert json.loads(body) == {"msg": "Missing Authorization Header"}
+
+
+def test_native_route_rejects_non_json_through_flask(server, make_user, fake_ai_async):
+    _, headers = make_user()
+
+    status, _, _ = asgi_request(server, *CHECK_PRODUCT, b"product_name=x", dict(headers, **{"Content-Type": "text/plain"}))
+
+    assert status == 415
+    assert fake_ai_async == []
+
+
+@pytest.mark.parametrize("declare_length", [True, False])
+def test_oversized_body_is_refused_before_it_is_read(app, server, make_user, fake_ai_async, declare_length):
+    _, headers = make_user()
+    app.config["ASGI_MAX_BODY"] = 1000
+    chunks = [b"x" * 600, b"x" * 600, b"x" * 600]
+    if declare_length:
+        headers["Content-Length"] = "1800"
+
+    status, _, _ = post_check(server, headers, chunks=chunks)
+
+    assert status == 413
+    assert fake_ai_async == []
+
+
+def test_other_routes_run_the_flask_app(server, make_user):
+    _, headers = make_user()
+
+    status, response_headers, body = asgi_request(server, "GET", "/allergy/", headers=headers)
+
+    assert status == 200
+    assert response_headers["content-type"] == "application/json"
+    assert json.loads(body)["allergies"] == []
+
+
+@pytest.mark.parametrize("product_name, error", [
+    ("", "Missing product name"),
+    ("x" * 201, "Product name is longer than 200 characters"),
+])
+def test_native_route_rejects_bad_product_names(server, make_user, fake_ai_async, product_name, error):
+    _, headers = make_user()
+
+    status, _, body = post_check(server, headers, {"product_name": product_name})
+
+    assert status == 400
+    assert json.loads(body) == {"error": error}
+    assert fake_ai_async == []
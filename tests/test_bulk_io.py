@@ -0,0 +1,143 @@
+import json
+
+import pytest
+from werkzeug.security import check_password_hash
+
+import utils.bulk_io as bulk_io
+from extensions import db
+from models.database import Allergy, User
+
+
+@pytest.fixture
+def admin_headers(app, make_user):
+    user_id, headers = make_user("admin")
+    app.config["ADMIN_USER_IDS"] = [user_id]
+    return headers
+
+
+def ndjson(*records):
+    return "".join((r if isinstance(r, str) else json.dumps(r)) + "\n" for r in records)
+
+
+def user(name, **fields):
+    return dict({"email": f"{name}@example.com", "username": name, "password_hash": "hash"}, **fields)
+
+
+def test_import_counts_malformed_records_as_invalid(app, client, admin_headers):
+    body = ndjson(
+        user("good", allergies=["Peanut", "peanut ", "Milk"]),
+        user("int_allergies", allergies=5),
+        user("mixed_allergies", allergies=["soy", 3]),
+        user("dict_allergies", allergies={"soy": True}),
+        user("int_password", password_hash=None, password=5),
+        {"email": ["x@example.com"], "username": "list_email", "password_hash": "hash"},
+        [1, 2, 3],
+        "{not json",
+        user("no_allergies"),
+    )
+
+    response = client.post("/admin/import", data=body, headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.json == {"imported": 2, "skipped": 0, "invalid": 7, "line": 9}
+    with app.app_context():
+        good = db.session.execute(db.select(User).where(User.username == "good")).scalar_one()
+        names = db.session.execute(db.select(Allergy.name).where(Allergy.user_id == good.id)).scalars().all()
+        assert sorted(names) == ["milk", "peanut"]
+
+
+@pytest.mark.parametrize("query", ["chunk_size=0", "chunk_size=-1", "skip=-1"])
+def test_import_rejects_bad_paging_parameters(client, admin_headers, query):
+    response = client.post(f"/admin/import?{query}", data=ndjson(user("a")), headers=admin_headers)
+
+    assert response.status_code == 400
+
+
+def test_export_round_trips_imported_users(client, admin_headers):
+    client.post("/admin/import", data=ndjson(user("a", allergies=["egg"]), user("b")), headers=admin_headers)
+
+    lines = [json.loads(line) for line in client.get("/admin/export", headers=admin_headers).data.splitlines()]
+
+    exported = {line["username"]: line["allergies"] for line in lines}
+    assert exported["a"] == ["egg"]
+    assert exported["b"] == []
+
+
+def run_import(app, path, *args):
+    return app.test_cli_runner().invoke(args=["admin", "import", str(path), *args])
+
+
+def usernames(app):
+    with app.app_context():
+        return db.session.execute(db.select(User.username).order_by(User.id)).scalars().all()
+
+
+@pytest.mark.parametrize("workers", ["0", "-2", "two"])
+def test_import_command_rejects_bad_worker_counts(app, tmp_path, workers):
+    source = tmp_path / "users.ndjson"
+    source.write_text(ndjson(user("a")))
+
+    result = run_import(app, source, "--workers", workers)
+
+    assert result.exit_code == 2
+    assert "--workers" in result.output
+    assert usernames(app) == []
+
+
+def test_import_command_hashes_plaintext_passwords_in_worker_processes(app, tmp_path, monkeypatch):
+    mapped = []
+
+    class Pool(bulk_io.ProcessPoolExecutor):
+        def map(self, fn, *iterables, **kwargs):
+            results = list(super().map(fn, *iterables, **kwargs))
+            mapped.append((fn.__name__, len(results), self._max_workers))
+            return results
+
+    monkeypatch.setattr(bulk_io, "ProcessPoolExecutor", Pool)
+    source = tmp_path / "users.ndjson"
+    source.write_text(ndjson(
+        user("plain", password_hash=None, password="correct horse"),
+        user("hashed", password_hash="pbkdf2:sha256:1$salt$digest"),
+    ))
+
+    result = run_import(app, source, "--workers", "1")
+
+    assert result.exit_code == 0, result.output
+    assert "Imported 2, skipped 0 existing, 0 invalid; committed through line 2." in result.output
+    with app.app_context():
+        plain, hashed = (db.session.execute(db.select(User).where(User.username == name)).scalar_one()
+                         for name in ("plain", "hashed"))
+        assert plain.password_hash != "correct horse"
+        assert check_password_hash(plain.password_hash, "correct horse")
+        assert hashed.password_hash == "pbkdf2:sha256:1$salt$digest"
+    assert mapped == [("generate_password_hash", 1, 1)]
+
+
+def test_import_command_resumes_after_the_last_committed_chunk(app, tmp_path, monkeypatch):
+    source = tmp_path / "users.ndjson"
+    source.write_text(ndjson(*[user(f"user{i}") for i in range(5)]))
+    checkpoint = tmp_path / "import.checkpoint"
+
+    chunks = []
+    import_chunk = bulk_io._import_chunk
+
+    def interrupted(records, pool):
+        if chunks:
+            raise KeyboardInterrupt
+        chunks.append([r["username"] for r in records])
+        return import_chunk(records, pool)
+
+    monkeypatch.setattr(bulk_io, "_import_chunk", interrupted)
+    first = run_import(app, source, "--checkpoint", str(checkpoint), "--chunk-size", "2", "--workers", "1")
+    monkeypatch.setattr(bulk_io, "_import_chunk", import_chunk)
+
+    assert first.exit_code != 0
+    assert checkpoint.read_text() == "2"
+    assert usernames(app) == ["user0", "user1"]
+
+    second = run_import(app, source, "--checkpoint", str(checkpoint), "--chunk-size", "2", "--workers", "1")
+
+    assert second.exit_code == 0, second.output
+    assert "Imported 3, skipped 0 existing, 0 invalid; committed through line 5." in second.output
+    assert checkpoint.read_text() == "5"
+    assert usernames(app) == [f"user{i}" for i in range(5)]
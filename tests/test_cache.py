@@ -0,0 +1,170 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from flask import Flask
+
+from utils.cache import Cache, LRUBackend, SQLiteBackend
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(params=["lru", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "lru":
+        return LRUBackend(max_entries=100)
+    return SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+
+
+@pytest.fixture
+def cache(backend):
+    cache = Cache()
+    cache._backend = backend
+    return cache
+
+
+def test_get_set_delete(backend):
+    assert backend.get("a") is None
+
+    backend.set("a", b"1")
+    backend.set("b", b"2")
+    backend.set("a", b"3")
+    assert backend.get("a") == b"3"
+    assert backend.get("b") == b"2"
+
+    backend.delete("a")
+    assert backend.get("a") is None
+    assert backend.get("b") == b"2"
+
+
+def test_entries_expire_after_ttl(backend):
+    backend.set("short", b"1", ttl=0.05)
+    backend.set("forever", b"2")
+    assert backend.get("short") == b"1"
+
+    time.sleep(0.1)
+
+    assert backend.get("short") is None
+    assert backend.get("forever") == b"2"
+
+
+def test_lru_evicts_least_recently_used():
+    backend = LRUBackend(max_entries=2)
+    backend.set("a", b"1")
+    backend.set("b", b"2")
+    backend.get("a")
+    backend.set("c", b"3")
+
+    assert backend.get("b") is None
+    assert backend.get("a") == b"1"
+    assert backend.get("c") == b"3"
+
+
+def test_sqlite_purges_expired_rows(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+    backend.PURGE_EVERY = 3
+    backend.set("old", b"1", ttl=0.01)
+    time.sleep(0.05)
+    backend.set("a", b"2")
+    backend.set("b", b"3")
+
+    rows = backend._connect().execute("SELECT key FROM cache ORDER BY key").fetchall()
+    assert rows == [("a",), ("b",)]
+
+
+def test_namespace_round_trips_python_values(cache):
+    ns = cache.namespace("verdicts")
+    ns.set(("chocolate", ("milk",)), {"verdict": "Unsafe", "reasons": ["milk"]})
+
+    assert ns.get(("chocolate", ("milk",))) == {"verdict": "Unsafe", "reasons": ["milk"]}
+    assert ns.get("missing", "default") == "default"
+
+
+def test_namespace_stores_plain_json(cache):
+    ns = cache.namespace("verdicts")
+    ns.set("chocolate", {"verdict": "Unsafe", "reasons": ("milk",)})
+
+    data = cache.backend.get("verdicts:chocolate")
+    assert json.loads(data) == {"verdict": "Unsafe", "reasons": ["milk"]}
+    assert ns.get("chocolate") == {"verdict": "Unsafe", "reasons": ["milk"]}
+
+
+def test_namespace_refuses_values_that_are_not_plain_data(cache):
+    ns = cache.namespace("verdicts")
+
+    with pytest.raises(TypeError):
+        ns.set("chocolate", object())
+
+
+@pytest.mark.parametrize("name, lookalikes", [
+    ("verdicts", ["verdictsx", "verdict"]),
+    # Would match if `%` / `_` in the prefix were treated as LIKE wildcards.
+    ("50%_off", ["50xx_off", "50%yoff", "50abcoff"]),
+    ("a_b", ["axb", "a_bc"]),
+])
+def test_namespace_clear_only_touches_its_own_keys(cache, name, lookalikes):
+    ns = cache.namespace(name)
+    others = [cache.namespace(other) for other in lookalikes]
+    ns.set("k", 1)
+    for other in others:
+        other.set("k", 2)
+
+    ns.clear()
+
+    assert ns.get("k") is None
+    for other in others:
+        assert other.get("k") == 2
+
+
+def test_namespace_stats_count_hits_misses_and_sets(cache):
+    ns = cache.namespace("stats", ttl=60)
+    ns.get("a")
+    ns.set("a", 1)
+    ns.get("a")
+    ns.get("a")
+
+    assert ns.stats() == {"hits": 2, "misses": 1, "sets": 1, "hit_rate": 2 / 3, "ttl": 60}
+    assert cache.stats() == {"stats": ns.stats()}
+
+
+def test_get_or_set_computes_only_on_miss(cache):
+    ns = cache.namespace("computed")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return None
+
+    assert ns.get_or_set("k", compute) is None
+    assert ns.get_or_set("k", compute) is None
+    assert len(calls) == 1
+
+
+def test_ttl_comes_from_config_then_namespace_then_default(tmp_path):
+    app = Flask(__name__, instance_path=str(tmp_path))
+    app.config.update(CACHE_DEFAULT_TTL=30, CACHE_TTLS={"configured": 5})
+    cache = Cache(app)
+
+    assert cache.namespace("configured", ttl=100).ttl == 5
+    assert cache.namespace("own", ttl=100).ttl == 100
+    assert cache.namespace("default").ttl == 30
+
+
+def test_sqlite_entries_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    backend = SQLiteBackend(path)
+    backend.set("from-parent", b"parent")
+
+    code = (
+        "import sys; sys.path.insert(0, sys.argv[1])\n"
+        "from utils.cache import SQLiteBackend\n"
+        "backend = SQLiteBackend(sys.argv[2])\n"
+        "assert backend.get('from-parent') == b'parent'\n"
+        "backend.set('from-child', b'child')\n"
+    )
+    subprocess.run([sys.executable, "-c", code, ROOT, path], check=True)
+
+    assert backend.get("from-child") == b"child"
@@ -0,0 +1,81 @@
+import datetime
+import decimal
+import uuid
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+PAYLOAD = {
+    "at": datetime.datetime(2026, 10, 19, 17, 38, 28, tzinfo=datetime.timezone.utc),
+    "naive": datetime.datetime(2026, 10, 19, 17, 38, 28),
+    "day": datetime.date(2026, 10, 19),
+    "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "price": decimal.Decimal("1.50"),
+    "b": [1, 2.5, None, True],
+    "a": {"nested": "value", "empty": []},
+}
+
+
+@pytest.fixture
+def json_app(app):
+    app.add_url_rule("/payload", "payload", lambda: PAYLOAD)
+    return app
+
+
+@pytest.mark.parametrize("debug", [False, True])
+def test_responses_match_the_stdlib_provider(json_app, debug):
+    json_app.debug = debug
+    with json_app.app_context():
+        expected = DefaultJSONProvider(json_app).response(PAYLOAD).get_data()
+
+    body = json_app.test_client().get("/payload").get_data()
+
+    assert body == expected
+    assert (b'\n  "a": {' in body) is debug
+
+
+def test_dates_are_formatted_like_flask(json_app):
+    data = json_app.test_client().get("/payload").get_json()
+
+    assert data["at"] == data["naive"] == "Mon, 19 Oct 2026 17:38:28 GMT"
+    assert data["day"] == "Mon, 19 Oct 2026 00:00:00 GMT"
+
+
+def test_dumps_matches_the_stdlib_provider(json_app):
+    with json_app.app_context():
+        assert json_app.json.loads(json_app.json.dumps(PAYLOAD)) == json_app.json.loads(
+            DefaultJSONProvider(json_app).dumps(PAYLOAD)
+        )
+
+
+def test_non_ascii_text_is_written_as_utf8(json_app, client, make_user, fake_ai):
+    _, headers = make_user()
+
+    response = client.post("/allergy/check_product", json={"product_name": "Crème Brûlée"}, headers=headers)
+
+    assert "crème brûlée".encode() in response.get_data()
+    assert response.get_json()["product"] == "crème brûlée"
+    with json_app.app_context():
+        assert json_app.json.loads(response.get_data()) == json_app.json.loads(
+            DefaultJSONProvider(json_app).response(response.get_json()).get_data()
+        )
+
+
+@pytest.mark.parametrize("debug", [False, True])
+def test_integers_beyond_64_bits_fall_back_to_the_stdlib(json_app, debug):
+    payload = {"big": 2 ** 64, "negative": -(2 ** 70), "ok": [1]}
+    json_app.add_url_rule("/big", "big", lambda: payload)
+    json_app.debug = debug
+    with json_app.app_context():
+        expected = DefaultJSONProvider(json_app).response(payload).get_data()
+        assert json_app.json.loads(json_app.json.dumps(payload)) == payload
+
+    response = json_app.test_client().get("/big")
+
+    assert response.status_code == 200
+    assert response.get_data() == expected
+
+
+def test_unserializable_objects_still_raise(json_app):
+    with json_app.app_context(), pytest.raises(TypeError):
+        json_app.json.dumps({"value": object()})
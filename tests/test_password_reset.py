@@ -0,0 +1,180 @@
+import logging
+import threading
+
+import pytest
+from itsdangerous import TimestampSigner
+
+from extensions import db, get_serializer, mail
+from models.database import User
+from routes.password_reset import RESET_MAX_AGE, RESET_SALT
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Record emails instead of sending them; set `sent.fail` or `sent.gate` to change that."""
+    class Sent(list):
+        fail = False
+        gate = None
+
+    sent = Sent()
+    sent.bodies = []
+
+    def send(msg):
+        if sent.gate is not None:
+            sent.gate.wait(5)
+        if sent.fail:
+            raise ConnectionRefusedError("SMTP is down")
+        sent.append((threading.current_thread().name, msg.recipients))
+        sent.bodies.append(msg.body)
+
+    monkeypatch.setattr(mail, "send", send)
+    return sent
+
+
+def request_reset(client, email="alice@example.com"):
+    return client.post("/password/reset", data={"email": email})
+
+
+def reset_link(client, sent, email="alice@example.com"):
+    """Request a reset for `email` and return the path of the emailed link."""
+    request_reset(client, email)
+    return "/password" + sent.bodies[-1].split("/password", 1)[1]
+
+
+def flashes(client):
+    with client.session_transaction() as session:
+        return [message for _, message in session.pop("_flashes", [])]
+
+
+def password_of(app, username="alice"):
+    with app.app_context():
+        return db.session.execute(db.select(User.password_hash).where(User.username == username)).scalar_one()
+
+
+def test_reset_link_sets_the_password(app, client, make_user, sent):
+    make_user("alice")
+    link = reset_link(client, sent)
+    flashes(client)
+
+    response = client.post(link, data={"password": "new-password"})
+
+    assert response.status_code == 302
+    assert flashes(client) == ["Your password has been updated!"]
+    with app.app_context():
+        assert db.session.execute(db.select(User).filter_by(username="alice")).scalar_one().check_password("new-password")
+
+
+def test_reset_link_cannot_be_reused(app, client, make_user, sent):
+    make_user("alice")
+    link = reset_link(client, sent)
+    client.post(link, data={"password": "new-password"})
+    password = password_of(app)
+    flashes(client)
+
+    get = client.get(link)
+    post = client.post(link, data={"password": "attacker"})
+
+    assert get.status_code == post.status_code == 302
+    assert flashes(client) == ["This reset link has already been used."] * 2
+    assert password_of(app) == password
+
+
+def test_old_email_only_token_is_rejected(app, client, make_user, sent):
+    make_user("alice")
+    with app.app_context():
+        token = get_serializer().dumps("alice@example.com", salt=RESET_SALT)
+
+    response = client.post(f"/password/reset_token/{token}", data={"password": "attacker"})
+
+    assert response.status_code == 302
+    assert flashes(client) == ["Invalid token."]
+    assert password_of(app) == "x"
+
+
+def test_expired_token_is_rejected(app, client, make_user, sent, monkeypatch):
+    make_user("alice")
+    issued = TimestampSigner.get_timestamp
+    monkeypatch.setattr(TimestampSigner, "get_timestamp", lambda self: issued(self) - RESET_MAX_AGE - 1)
+    link = reset_link(client, sent)
+    monkeypatch.setattr(TimestampSigner, "get_timestamp", issued)
+    flashes(client)
+
+    response = client.post(link, data={"password": "attacker"})
+
+    assert response.status_code == 302
+    assert flashes(client) == ["The token has expired."]
+    assert password_of(app) == "x"
+
+
+def test_token_is_rejected_once_the_password_changed_elsewhere(app, client, make_user, sent):
+    make_user("alice")
+    link = reset_link(client, sent)
+    with app.app_context():
+        db.session.execute(db.select(User).filter_by(username="alice")).scalar_one().set_password("changed")
+        db.session.commit()
+    password = password_of(app)
+    flashes(client)
+
+    response = client.post(link, data={"password": "attacker"})
+
+    assert response.status_code == 302
+    assert flashes(client) == ["Invalid token."]
+    assert password_of(app) == password
+
+
+def test_other_reset_links_stop_working_after_a_reset(app, client, make_user, sent):
+    make_user("alice")
+    first = reset_link(client, sent)
+    second = reset_link(client, sent)
+    client.post(first, data={"password": "new-password"})
+    password = password_of(app)
+    flashes(client)
+
+    client.post(second, data={"password": "attacker"})
+
+    assert flashes(client) == ["Invalid token."]
+    assert password_of(app) == password
+
+
+def test_reset_mail_is_sent_inline_by_default(client, make_user, sent):
+    make_user("alice")
+
+    response = request_reset(client)
+
+    assert response.status_code == 302
+    assert sent == [(threading.current_thread().name, ["alice@example.com"])]
+
+
+def test_async_reset_mail_failures_are_logged(app, client, make_user, sent, caplog):
+    app.config["MAIL_SEND_ASYNC"] = True
+    make_user("alice")
+    sent.fail = True
+
+    with caplog.at_level(logging.ERROR, logger=app.logger.name):
+        assert request_reset(client).status_code == 302
+        app.extensions["mail_pool"].executor.shutdown(wait=True)
+
+    [record] = caplog.records
+    assert record.getMessage() == "Error sending email to alice@example.com"
+    assert isinstance(record.exc_info[1], ConnectionRefusedError)
+
+
+def test_async_reset_mail_falls_back_to_inline_when_pool_is_full(app, client, make_user, sent):
+    app.config.update(MAIL_SEND_ASYNC=True, MAIL_WORKERS=1, MAIL_MAX_PENDING=1)
+    make_user("alice")
+    make_user("bob")
+    sent.gate = threading.Event()
+
+    request_reset(client, "alice@example.com")
+    waiting = threading.Thread(target=request_reset, args=(app.test_client(), "bob@example.com"))
+    waiting.start()
+    waiting.join(0.2)
+    assert waiting.is_alive(), "second email should be sent inline while the pool is busy"
+
+    sent.gate.set()
+    waiting.join(5)
+    app.extensions["mail_pool"].executor.shutdown(wait=True)
+
+    threads = {recipients[0]: name for name, recipients in sent}
+    assert threads["alice@example.com"].startswith("mail")
+    assert not threads["bob@example.com"].startswith("mail")
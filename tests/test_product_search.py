@@ -0,0 +1,93 @@
+from extensions import db
+from models.database import Product
+from utils.product_search import product_index, seed_products
+
+
+def add_products(app, *names):
+    with app.app_context():
+        db.session.add_all([Product(name=name) for name in names])
+        db.session.commit()
+
+
+def test_resolve_does_not_merge_similar_products(app):
+    add_products(app, "peanut soup", "peanut butter cups")
+
+    with app.app_context():
+        assert product_index.resolve("pea soup") == "pea soup"
+        assert product_index.resolve("Peanut Butter") == "peanut butter"
+        assert db.session.execute(db.select(db.func.count(Product.id))).scalar() == 4
+
+
+def test_resolve_normalizes_case_and_spacing(app):
+    add_products(app, "milk chocolate")
+
+    with app.app_context():
+        assert product_index.resolve("  Milk   CHOCOLATE ") == "milk chocolate"
+        assert db.session.execute(db.select(db.func.count(Product.id))).scalar() == 1
+
+
+def test_resolve_leaves_the_commit_to_the_caller(app):
+    with app.app_context():
+        assert product_index.resolve("oat bar") == "oat bar"
+        db.session.rollback()
+
+        assert db.session.execute(db.select(db.func.count(Product.id))).scalar() == 0
+
+
+def test_check_product_rejects_names_too_long_for_the_product_table(app, client, make_user, fake_ai):
+    _, headers = make_user()
+    longest = "x" * 200
+
+    too_long = client.post("/allergy/check_product", json={"product_name": longest + "x"}, headers=headers)
+    fits = client.post("/allergy/check_product", json={"product_name": f" {longest}  "}, headers=headers)
+
+    assert too_long.status_code == 400
+    assert too_long.get_json() == {"error": "Product name is longer than 200 characters"}
+    assert fits.status_code == 200
+    assert fake_ai.calls == [longest]
+    with app.app_context():
+        assert db.session.execute(db.select(Product.name)).scalars().all() == [longest]
+
+
+def test_check_product_keeps_distinct_verdicts_for_similar_names(client, make_user, fake_ai):
+    _, headers = make_user()
+
+    for name in ["peanut soup", "pea soup"]:
+        response = client.post("/allergy/check_product", json={"product_name": name}, headers=headers)
+        assert response.json["product"] == name
+
+    assert fake_ai.calls == ["peanut soup", "pea soup"]
+
+
+def test_search_suggests_curated_products_to_everyone(app, client, make_user):
+    _, headers = make_user()
+    with app.app_context():
+        seed_products(["Peanut Butter Cups", "Pea Soup"])
+        db.session.commit()
+
+    response = client.get("/allergy/products/search?q=pea", headers=headers)
+
+    assert set(response.json["products"]) == {"peanut butter cups", "pea soup"}
+
+
+def test_search_keeps_checked_products_private(client, make_user, fake_ai):
+    _, alice = make_user("alice")
+    _, bob = make_user("bob")
+
+    client.post("/allergy/check_product", json={"product_name": "Rash Cream Rx"}, headers=alice)
+
+    assert client.get("/allergy/products/search?q=rash", headers=alice).json["products"] == ["rash cream rx"]
+    assert client.get("/allergy/products/search?q=rash", headers=bob).json["products"] == []
+
+
+def test_seed_products_command_marks_existing_and_new_products(app, tmp_path):
+    add_products(app, "oat milk")
+    source = tmp_path / "products.txt"
+    source.write_text("Oat Milk\nsoy  milk\n\n")
+
+    result = app.test_cli_runner().invoke(args=["admin", "seed-products", str(source)])
+
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        rows = db.session.execute(db.select(Product.name, Product.curated).order_by(Product.name)).all()
+        assert [tuple(row) for row in rows] == [("oat milk", True), ("soy milk", True)]
@@ -0,0 +1,16 @@
+from benchmarks import check_query_plans
+
+
+def test_route_queries_use_indexes(tmp_path):
+    app = check_query_plans.build_app(
+        f"sqlite:///{tmp_path / 'plans.db'}",
+        SECRET_KEY="test",
+        JWT_SECRET_KEY="test-jwt-secret-key-of-at-least-32-bytes",
+    )
+
+    results, unexercised = check_query_plans.check(app, rows=5000)
+
+    assert unexercised == []
+    assert len(results) > 30
+    full_scans = {" ".join(sql.split()): (steps, lines) for steps, sql, lines, scans in results if scans}
+    assert full_scans == {}
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+
+import pytest
+
+from utils.ai_processing import SingleFlight, product_checks
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls, results = [], []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return "verdict"
+
+    def caller():
+        results.append(flight.do("choc bar", work))
+
+    threads = [threading.Thread(target=caller) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["coalesced"] < 4:
+        threading.Event().wait(0.01)
+    assert flight.stats() == {"in_flight": 1, "coalesced": 4}
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["verdict"] * 5
+    assert flight.stats() == {"in_flight": 0, "coalesced": 4}
+
+
+def test_waiting_callers_receive_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def work():
+        release.wait(5)
+        raise RuntimeError("Gemini is down")
+
+    def caller():
+        try:
+            flight.do("choc bar", work)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=caller) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["coalesced"] < 2:
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(errors) == 3
+    assert len({id(e) for e in errors}) == 1
+    assert flight.do("choc bar", lambda: "recovered") == "recovered"
+
+
+def test_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+
+    assert [flight.do("choc bar", lambda: n) for n in range(3)] == [0, 1, 2]
+    assert flight.stats() == {"in_flight": 0, "coalesced": 0}
+
+
+def test_async_calls_share_one_task_and_its_exception():
+    flight = SingleFlight()
+    calls = []
+
+    async def work(fail):
+        calls.append(fail)
+        await asyncio.sleep(0.01)
+        if fail:
+            raise RuntimeError("Gemini is down")
+        return "verdict"
+
+    async def main():
+        ok = await asyncio.gather(*[flight.do_async("ok", work, False) for _ in range(4)])
+        failed = await asyncio.gather(*[flight.do_async("bad", work, True) for _ in range(3)], return_exceptions=True)
+        return ok, failed
+
+    ok, failed = asyncio.run(main())
+
+    assert calls == [False, True]
+    assert ok == ["verdict"] * 4
+    assert [str(e) for e in failed] == ["Gemini is down"] * 3
+    assert flight.stats() == {"in_flight": 0, "coalesced": 5}
+
+
+@pytest.fixture
+def admin_headers(app, make_user):
+    user_id, headers = make_user("admin")
+    app.config["ADMIN_USER_IDS"] = [user_id]
+    return headers
+
+
+def test_admin_stats_reports_coalesced_product_checks(client, admin_headers, make_user):
+    _, headers = make_user("alice")
+    product_checks.coalesced = 3
+
+    response = client.get("/admin/stats", headers=admin_headers)
+
+    assert response.status_code == 200
+    assert response.get_json()["product_checks"] == {"in_flight": 0, "coalesced": 3}
+    assert "reset_nonces" in response.get_json()["cache"]
+    assert client.get("/admin/stats", headers=headers).status_code == 403
@@ -0,0 +1,182 @@
+import json
+import threading
+import time
+import urllib.request
+from datetime import datetime, timedelta
+
+import click
+from werkzeug.serving import make_server
+
+from extensions import db
+from models.database import Product, UserProductVerdict
+from utils.verdicts import VerdictRefresher
+
+
+def serve(app):
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def post_json(url, body, headers):
+    request = urllib.request.Request(
+        url, data=json.dumps(body).encode(), method="POST",
+        headers=dict(headers, **{"Content-Type": "application/json"}),
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_concurrent_checks_of_same_product_all_succeed(app, make_user, fake_ai):
+    user_id, headers = make_user()
+    fake_ai.latency = 0.2
+    server = serve(app)
+    url = f"http://127.0.0.1:{server.server_port}/allergy/check_product"
+
+    results = [None] * 6
+    def check(i):
+        results[i] = post_json(url, {"product_name": "Choc Bar"}, headers)
+
+    threads = [threading.Thread(target=check, args=(i,)) for i in range(len(results))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+
+    assert [status for status, _ in results] == [200] * len(results), results
+    assert len(fake_ai.calls) == 1
+    with app.app_context():
+        rows = db.session.execute(db.select(UserProductVerdict).where(UserProductVerdict.user_id == user_id)).all()
+        assert len(rows) == 1
+
+
+def test_repeat_check_is_served_from_stored_verdict(client, make_user, fake_ai):
+    _, headers = make_user()
+
+    first = client.post("/allergy/check_product", json={"product_name": "Choc Bar"}, headers=headers)
+    second = client.post("/allergy/check_product", json={"product_name": "choc  bar"}, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json["message"] == second.json["message"]
+    assert len(fake_ai.calls) == 1
+
+
+def test_stale_verdicts_are_refreshed_on_start_up(app, make_user, fake_ai):
+    user_id, _ = make_user()
+    with app.app_context():
+        product = Product(name="choc bar")
+        db.session.add(product)
+        db.session.flush()
+        db.session.add(UserProductVerdict(
+            user_id=user_id, product_id=product.id, verdict="Unsafe", explanation="old",
+            allergy_version=0, stale=True, checked_at=datetime.utcnow(),
+        ))
+        db.session.commit()
+
+    app.config["VERDICT_REFRESH_ENABLED"] = True
+    refresher = VerdictRefresher()
+    refresher.init_app(app)
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with app.app_context():
+            row = db.session.execute(db.select(UserProductVerdict)).scalar_one()
+            if not row.stale:
+                break
+        time.sleep(0.05)
+
+    assert not row.stale
+    assert row.verdict == "Safe"
+    assert fake_ai.calls == ["choc bar"]
+
+
+def add_stale_verdicts(app, user_id, names):
+    with app.app_context():
+        for name in names:
+            product = Product(name=name)
+            db.session.add(product)
+            db.session.flush()
+            db.session.add(UserProductVerdict(
+                user_id=user_id, product_id=product.id, verdict="Unsafe", explanation="old",
+                allergy_version=0, stale=True, checked_at=datetime.utcnow(),
+            ))
+        db.session.commit()
+
+
+def test_concurrent_refreshers_ask_the_ai_once_per_row(app, make_user, fake_ai):
+    user_id, _ = make_user()
+    names = [f"product {i}" for i in range(6)]
+    add_stale_verdicts(app, user_id, names)
+    fake_ai.latency = 0.05
+
+    # One refresher per worker process, all sweeping the same user after a restart.
+    refreshers = [VerdictRefresher(batch_size=2) for _ in range(3)]
+    for refresher in refreshers:
+        refresher.init_app(app)
+
+    def refresh(refresher):
+        with app.app_context():
+            refresher.refresh_user(user_id)
+            db.session.remove()
+
+    threads = [threading.Thread(target=refresh, args=(refresher,)) for refresher in refreshers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(fake_ai.calls) == names
+    with app.app_context():
+        rows = db.session.execute(db.select(UserProductVerdict)).scalars().all()
+        assert [(row.stale, row.refreshing_until) for row in rows] == [(False, None)] * len(names)
+
+
+def test_rows_claimed_by_another_process_are_skipped_until_the_lease_expires(app, make_user, fake_ai):
+    user_id, _ = make_user()
+    add_stale_verdicts(app, user_id, ["choc bar"])
+    refresher = VerdictRefresher()
+    refresher.init_app(app)
+
+    with app.app_context():
+        db.session.execute(db.update(UserProductVerdict).values(refreshing_until=datetime.utcnow() + timedelta(minutes=5)))
+        db.session.commit()
+        refresher.refresh_user(user_id)
+        assert fake_ai.calls == []
+
+        db.session.execute(db.update(UserProductVerdict).values(refreshing_until=datetime.utcnow() - timedelta(seconds=1)))
+        db.session.commit()
+        refresher.refresh_user(user_id)
+        assert fake_ai.calls == ["choc bar"]
+
+
+def test_failed_refresh_releases_its_claim(app, make_user, monkeypatch):
+    import utils.verdicts as verdicts
+
+    user_id, _ = make_user()
+    add_stale_verdicts(app, user_id, ["choc bar"])
+    monkeypatch.setattr(verdicts, "check_product_safety", lambda name, allergies: ("Error", "AI down"))
+    refresher = VerdictRefresher()
+    refresher.init_app(app)
+
+    with app.app_context():
+        refresher.refresh_user(user_id)
+        row = db.session.execute(db.select(UserProductVerdict)).scalar_one()
+        assert row.stale and row.refreshing_until is None
+
+
+def test_refresher_does_not_start_for_cli_commands(app, monkeypatch):
+    monkeypatch.setenv("FLASK_RUN_FROM_CLI", "true")
+    app.config["VERDICT_REFRESH_ENABLED"] = True
+
+    refresher = VerdictRefresher()
+    with click.Context(click.Command("upgrade"), info_name="upgrade"):
+        refresher.init_app(app)
+    assert refresher._thread is None
+
+    with click.Context(click.Command("run"), info_name="run"):
+        refresher.init_app(app)
+    assert refresher._thread is not None
@@ -1,14 +1,209 @@
+import asyncio
+import os
+import threading
 import google.generativeai as genai
+from google.ai import generativelanguage as glm
 from config import Config
 
-genai.configure(api_key=Config.GEMINI_API_KEY)
+MODEL_NAME = "gemini-1.5-flash"
+
+
+def configure_genai():
+    """
+    Configure the Gemini SDK. The transport is the SDK default (gRPC) unless
+    `GEMINI_TRANSPORT` is set, e.g. to "rest" for an HTTP stand-in endpoint.
+    """
+    client_options = {}
+    endpoint = getattr(Config, "GEMINI_API_ENDPOINT", None)
+    if endpoint:
+        client_options["api_endpoint"] = endpoint
+
+    genai.configure(
+        api_key=Config.GEMINI_API_KEY,
+        transport=getattr(Config, "GEMINI_TRANSPORT", None),
+        client_options=client_options or None,
+    )
+
+
+class ModelClientManager:
+    """
+    Process-wide cache of Gemini model handles.
+
+    Handles are built once per worker and shared between threads. The SDK
+    already caches its own client, so this saves little per call; what it adds
+    is fork safety: the child drops the parent's handles and SDK clients (their
+    connections belong to the parent) and optionally re-warms in the background.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+        self._async_clients = {}
+        self._pid = os.getpid()
+        self._warm_after_fork = False
+
+    def get(self, model_name=MODEL_NAME):
+        """Return the shared `GenerativeModel` for `model_name`, building it on first use."""
+        if self._pid != os.getpid():
+            self.reset()
+
+        model = self._models.get(model_name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(model_name)
+                if model is None:
+                    model = genai.GenerativeModel(model_name)
+                    self._models[model_name] = model
+        return model
+
+    def get_async(self):
+        """
+        Return the async Gemini API client for the running event loop. The SDK's
+        async path needs the grpc.aio transport, and aio channels are bound to one
+        loop, so each loop gets its own client.
+        """
+        if self._pid != os.getpid():
+            self.reset()
+
+        key = id(asyncio.get_running_loop())
+        client = self._async_clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._async_clients.get(key)
+                if client is None:
+                    client_options = {"api_key": Config.GEMINI_API_KEY}
+                    endpoint = getattr(Config, "GEMINI_API_ENDPOINT", None)
+                    if endpoint:
+                        client_options["api_endpoint"] = endpoint
+                    client = glm.GenerativeServiceAsyncClient(
+                        transport="grpc_asyncio", client_options=client_options
+                    )
+                    self._async_clients[key] = client
+        return client
+
+    def warm(self, model_name=MODEL_NAME):
+        """Build the model handle and open its connection with a cheap token-count call."""
+        self._warm_after_fork = True
+        try:
+            self.get(model_name).count_tokens("ping")
+        except Exception as e:
+            print("Error warming Gemini client:", e)
+
+    def warm_in_background(self, model_name=MODEL_NAME):
+        """Run `warm` on a daemon thread so worker start-up is not blocked."""
+        self._warm_after_fork = True
+        threading.Thread(target=self.warm, args=(model_name,), daemon=True).start()
+
+    def reset(self):
+        """Forget all handles and SDK clients, e.g. in a freshly forked worker."""
+        self._lock = threading.Lock()
+        self._models = {}
+        self._async_clients = {}
+        self._pid = os.getpid()
+        configure_genai()
+
+    def _after_fork(self):
+        self.reset()
+        if self._warm_after_fork:
+            self.warm_in_background()
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight wait for it and receive the same result (or exception).
+    `coalesced` counts the calls that were served this way.
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self.reset()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        """Coroutine version of `do`: callers on the same event loop await one shared task."""
+        key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            future = self._futures.get(key)
+            leader = future is None
+            if leader:
+                future = self._futures[key] = asyncio.ensure_future(fn(*args, **kwargs))
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return await asyncio.shield(future)
+
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._forget(key)
+            else:
+                future.add_done_callback(lambda _: self._forget(key))
+
+    def _forget(self, key):
+        with self._lock:
+            self._futures.pop(key, None)
+
+    def stats(self):
+        """Calls in flight and calls coalesced so far, in this process."""
+        with self._lock:
+            return {"in_flight": len(self._calls) + len(self._futures), "coalesced": self.coalesced}
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._futures = {}
+        self.coalesced = 0
+
+
+configure_genai()
+clients = ModelClientManager()
+product_checks = SingleFlight()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=clients._after_fork)
+    os.register_at_fork(after_in_child=product_checks.reset)
 
 def extract_allergens(text):
     """Send extracted text to Gemini AI and retrieve allergens."""
     prompt = f"Extract all allergens from the following text: {text}. Return only the allergens as a list."
 
     try:
-        model = genai.GenerativeModel("gemini-1.5-flash")
+        model = clients.get()
         response = model.generate_content(prompt)
         return response.text.split("\n") 
     except Exception as e:
@@ -17,10 +212,29 @@ def extract_allergens(text):
 
 
 def check_product_safety(product_name, user_allergies):
-    """Uses AI to determine if a product contains allergens and returns a verdict + explanation."""
-    try:
-        allergies_formatted = ", ".join(user_allergies)
-        prompt = f"""
+    """
+    Uses AI to determine if a product contains allergens and returns a verdict + explanation.
+    Concurrent checks for the same normalized product and allergy set share one AI call.
+    """
+    product, allergies = _normalize_check(product_name, user_allergies)
+    return product_checks.do((product, allergies), _check_product_safety, product, list(allergies))
+
+
+async def check_product_safety_async(product_name, user_allergies):
+    """Coroutine version of `check_product_safety` that yields the event loop while the AI call runs."""
+    product, allergies = _normalize_check(product_name, user_allergies)
+    return await product_checks.do_async((product, allergies), _check_product_safety_async, product, list(allergies))
+
+
+def _normalize_check(product_name, user_allergies):
+    product = " ".join(product_name.lower().split())
+    allergies = tuple(sorted({a.strip().lower() for a in user_allergies if a.strip()}))
+    return product, allergies
+
+
+def _safety_prompt(product_name, user_allergies):
+    allergies_formatted = ", ".join(user_allergies)
+    return f"""
         A user has allergies to: {allergies_formatted}.
         Determine if the product "{product_name}" is safe for them.
 
@@ -32,23 +246,39 @@ def check_product_safety(product_name, user_allergies):
         Explanation: <short explanation>
         """
 
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        response = model.generate_content(prompt)
-        raw_output = response.text.strip()
 
-        verdict = None
-        explanation = None
-        for line in raw_output.splitlines():
-            if line.lower().startswith("verdict:"):
-                verdict = line.split(":", 1)[1].strip()
-            elif line.lower().startswith("explanation:"):
-                explanation = line.split(":", 1)[1].strip()
+def _parse_verdict(raw_output):
+    verdict = None
+    explanation = None
+    for line in raw_output.splitlines():
+        if line.lower().startswith("verdict:"):
+            verdict = line.split(":", 1)[1].strip()
+        elif line.lower().startswith("explanation:"):
+            explanation = line.split(":", 1)[1].strip()
+
+    if verdict and explanation:
+        return verdict, explanation
+    else:
+        return "Unknown", raw_output 
 
-        if verdict and explanation:
-            return verdict, explanation
-        else:
-            return "Unknown", raw_output 
 
+def _check_product_safety(product_name, user_allergies):
+    try:
+        model = clients.get()
+        response = model.generate_content(_safety_prompt(product_name, user_allergies))
+        return _parse_verdict(response.text.strip())
+    except Exception as e:
+        return "Error", f"AI request failed: {str(e)}"
+
+
+async def _check_product_safety_async(product_name, user_allergies):
+    try:
+        response = await clients.get_async().generate_content(
+            model=f"models/{MODEL_NAME}",
+            contents=[glm.Content(role="user", parts=[glm.Part(text=_safety_prompt(product_name, user_allergies))])],
+        )
+        text = "".join(part.text for part in response.candidates[0].content.parts)
+        return _parse_verdict(text.strip())
     except Exception as e:
         return "Error", f"AI request failed: {str(e)}"
 
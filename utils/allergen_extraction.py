@@ -0,0 +1,281 @@
+"""
+Offline allergen extraction for medical and lab reports and food labels.
+
+A rule-plus-lexicon model: a lexicon maps allergen names, synonyms and common
+spellings to canonical allergy names, and polarity rules decide for each
+mention whether the report marks it as an allergy (positive, reactive, high
+IgE, "allergic to") or rules it out (negative, class 0, "no known allergy to").
+
+Food labels get their own rules (`LABEL_RULES`): an allergen named on a label
+is present unless the label says it is not ("gluten free", "free from milk",
+"does not contain peanuts").
+
+The compiled models are built once per worker with `get_extractor()` and
+`get_label_extractor()` and run on CPU with no network access.
+"""
+
+import re
+import threading
+
+LEXICON = {
+    "peanut": ["peanut", "peanuts", "groundnut", "groundnuts", "arachis"],
+    "tree nuts": ["tree nut", "tree nuts"],
+    "almond": ["almond", "almonds"],
+    "cashew": ["cashew", "cashews"],
+    "walnut": ["walnut", "walnuts"],
+    "pecan": ["pecan", "pecans"],
+    "hazelnut": ["hazelnut", "hazelnuts", "filbert", "filberts"],
+    "pistachio": ["pistachio", "pistachios"],
+    "brazil nut": ["brazil nut", "brazil nuts"],
+    "macadamia": ["macadamia", "macadamia nut", "macadamia nuts"],
+    "milk": ["milk", "cow's milk", "cows milk", "dairy", "casein", "whey", "lactose", "lactalbumin"],
+    "egg": ["egg", "eggs", "egg white", "egg yolk", "ovalbumin", "ovomucoid", "albumen"],
+    "soy": ["soy", "soya", "soybean", "soybeans", "soy bean"],
+    "wheat": ["wheat", "gluten", "gliadin"],
+    "sesame": ["sesame", "sesame seed", "sesame seeds", "tahini"],
+    "fish": ["fish", "codfish", "cod", "salmon", "tuna", "halibut", "tilapia"],
+    "shellfish": ["shellfish", "shrimp", "prawn", "prawns", "crab", "lobster", "crayfish", "crustacean", "crustaceans"],
+    "mollusc": ["mollusc", "molluscs", "mollusk", "mollusks", "clam", "clams", "oyster", "oysters", "mussel", "mussels", "scallop", "scallops", "squid"],
+    "mustard": ["mustard"],
+    "celery": ["celery", "celeriac"],
+    "lupin": ["lupin", "lupine"],
+    "sulfites": ["sulfite", "sulfites", "sulphite", "sulphites"],
+    "corn": ["corn", "maize"],
+    "kiwi": ["kiwi", "kiwifruit"],
+    "latex": ["latex", "natural rubber latex"],
+    "dust mite": ["dust mite", "dust mites", "house dust mite", "dermatophagoides"],
+    "cat dander": ["cat dander", "cat hair", "cat epithelium"],
+    "dog dander": ["dog dander", "dog hair", "dog epithelium"],
+    "grass pollen": ["grass pollen", "timothy grass", "bermuda grass", "ryegrass", "rye grass"],
+    "tree pollen": ["tree pollen", "birch", "birch pollen", "oak pollen", "alder"],
+    "ragweed": ["ragweed", "short ragweed", "ambrosia"],
+    "mold": ["mold", "mould", "molds", "moulds", "alternaria", "aspergillus", "cladosporium", "penicillium notatum"],
+    "cockroach": ["cockroach", "cockroaches"],
+    "bee venom": ["bee venom", "bee sting", "bee stings", "honeybee venom", "honey bee venom"],
+    "wasp venom": ["wasp venom", "wasp sting", "wasp stings", "yellow jacket", "yellow jacket venom"],
+    "penicillin": ["penicillin", "penicillins", "amoxicillin", "ampicillin"],
+    "sulfa drugs": ["sulfa", "sulfa drugs", "sulfonamide", "sulfonamides", "sulfamethoxazole"],
+    "cephalosporins": ["cephalosporin", "cephalosporins", "cephalexin", "ceftriaxone"],
+    "aspirin": ["aspirin", "acetylsalicylic acid"],
+    "nsaids": ["nsaid", "nsaids", "ibuprofen", "naproxen"],
+    "codeine": ["codeine"],
+    "iodine contrast": ["iodine", "contrast dye", "iodinated contrast"],
+}
+
+NEGATIVE_CUES = [
+    r"no(?:\s+known)?\s+(?:allerg\w*|reactions?|sensitivit\w*|intoleran\w*)(?:\s+(?:to|for))?",
+    r"not\s+(?:detected|allergic|reactive|sensiti[sz]ed)",
+    r"none\s+detected",
+    r"non-?reactive",
+    r"negative(?:\s+(?:to|for))?",
+    r"denies\b[^.;]*?\ballerg\w*",
+    r"undetectable",
+    r"absent",
+    r"tolerates?",
+    r"class\s*0\b",
+    r"<\s*0?\.\d+(?:\s*ku(?:a)?/l)?",
+    r"not(?:\s+(?:to|for))?\b",
+]
+
+POSITIVE_CUES = [
+    r"positive(?:\s+(?:to|for))?",
+    r"reactive(?:\s+(?:to|for))?",
+    r"detected",
+    r"elevated",
+    r"high",
+    r"allergic(?:\s+(?:to|for))?",
+    r"allerg(?:y|ies)(?:\s+(?:to|for))?",
+    r"sensiti(?:[sz]ed|vity|ve)(?:\s+(?:to|for))?",
+    r"intoleran(?:ce|t)(?:\s+(?:to|for))?",
+    r"anaphyla\w*",
+    r"hives",
+    r"urticaria",
+    r"rash",
+    r"angioedema",
+    r"class\s*[1-6]\b",
+]
+
+NEUTRAL_CUES = [
+    r"(?:mother|father|sister|brother|siblings?|parents?|family\s+history)\b[^.;]*?\ballerg\w*(?:\s+(?:to|for))?",
+    r"panel",
+    r"screen\w*",
+    r"tested\s+for",
+    r"ordered",
+    r"reference\s+range",
+]
+
+# Cues ending like this apply to the mentions after them ("allergic to milk",
+# "eggs but not milk").
+PREFIX_CUE = r"(?:\s+(?:to|for)|\bnot)$"
+
+LABEL_NEGATIVE_CUES = [
+    r"free\s+(?:from|of)",
+    r"(?:does\s+not|doesn't|do\s+not|don't)\s+contain",
+    r"contains?\s+no",
+    r"(?:made\s+)?without",
+    r"free\b",
+]
+
+LABEL_POSITIVE_CUES = [
+    r"(?:may\s+)?contains?",
+    r"(?:may\s+contain\s+)?traces?\s+of",
+    r"(?:made|produced|processed|packed)\s+(?:in|on)\b[^.;]*?\b(?:with|handles|processes|also)",
+]
+
+LABEL_RULES = {
+    "negative_cues": LABEL_NEGATIVE_CUES,
+    "positive_cues": LABEL_POSITIVE_CUES,
+    "neutral_cues": [],
+    "prefix_cue": r"(?:\s+(?:from|of)|contains?(?:\s+no)?|without|with|handles|processes|also)$",
+    # "gluten free oats, milk": "free" rules out gluten only, not milk after it.
+    "suffix_cue": r"free$",
+}
+
+IGE_UNIT = re.compile(r"ku(?:a)?/l")
+IGE_VALUE = re.compile(r"(?<![<\d.])(\d+(?:\.\d+)?)\s*ku(?:a)?/l")
+IGE_BARE_VALUE = re.compile(r"(?<![\w<.(])(\d+\.\d+)(?![\w.)])")
+POSITIVE_IGE_THRESHOLD = 0.35
+
+CLAUSE_SPLIT = re.compile(r"[;.](?!\d)|\bbut\b")
+
+
+class AllergenExtractor:
+    """
+    Compiled lexicon and polarity rules. Build once and reuse; instances are
+    immutable and safe to share between threads.
+    """
+
+    def __init__(self, lexicon=LEXICON, negative_cues=NEGATIVE_CUES, positive_cues=POSITIVE_CUES,
+                 neutral_cues=NEUTRAL_CUES, prefix_cue=PREFIX_CUE, suffix_cue=None):
+        self.canonical = {}
+        for name, synonyms in lexicon.items():
+            for synonym in [name] + synonyms:
+                self.canonical[synonym.lower()] = name
+
+        terms = sorted(self.canonical, key=len, reverse=True)
+        self.mention_re = re.compile(r"\b(" + "|".join(re.escape(t) for t in terms) + r")\b")
+        self.cue_re = re.compile(
+            "|".join(
+                [f"(?P<neg{i}>(?<!\\w){c})" for i, c in enumerate(negative_cues)]
+                + [f"(?P<pos{i}>(?<!\\w){c})" for i, c in enumerate(positive_cues)]
+                + [f"(?P<neu{i}>(?<!\\w){c})" for i, c in enumerate(neutral_cues)]
+            )
+        )
+        self.prefix_re = re.compile(prefix_cue)
+        self.suffix_re = re.compile(suffix_cue) if suffix_cue else None
+
+    def _cues(self, clause, ige_columns=False):
+        """Return (start, end, polarity, kind) for each cue; kind is "prefix", "suffix" or None."""
+        cues = []
+        for match in self.cue_re.finditer(clause):
+            polarity = match.lastgroup[:3]
+            if self.prefix_re.search(match.group()):
+                kind = "prefix"
+            elif self.suffix_re is not None and self.suffix_re.search(match.group()):
+                kind = "suffix"
+            else:
+                kind = None
+            cues.append((match.start(), match.end(), polarity, kind))
+
+        values = IGE_BARE_VALUE if ige_columns else IGE_VALUE
+        for match in values.finditer(clause):
+            polarity = "pos" if float(match.group(1)) >= POSITIVE_IGE_THRESHOLD else "neg"
+            cues.append((match.start(), match.end(), polarity, None))
+        return sorted(cues)
+
+    def _clause_mentions(self, clause, section, ige_columns):
+        mentions = [(m.start(), m.end(), self.canonical[m.group(1)]) for m in self.mention_re.finditer(clause)]
+        if not mentions:
+            return []
+
+        cues = self._cues(clause, ige_columns)
+        results = []
+        for i, (start, end, name) in enumerate(mentions):
+            next_start = mentions[i + 1][0] if i + 1 < len(mentions) else len(clause)
+            following = [c for c in cues if end <= c[0] < next_start and c[3] != "prefix"]
+            preceding = [c for c in cues if c[0] < start and c[3] != "suffix"]
+
+            if following:
+                polarity = next((c[2] for c in following if c[2] != "neu"), following[0][2])
+            elif preceding:
+                polarity = preceding[-1][2]
+            else:
+                polarity = section or "pos"
+            results.append((name, polarity))
+        return results
+
+    def extract_lines(self, lines):
+        """
+        Return the canonical allergens marked positive in a sequence of report lines.
+        An allergen ruled out in one line and confirmed in another is reported.
+
+        Header lines steer the lines below them: "Positive results:" style headers
+        set a default polarity, and a table header naming kU/L units makes bare
+        decimals in later rows count as IgE values.
+        """
+        found = []
+        section = None
+        ige_columns = False
+
+        for line in lines:
+            text = line.strip().lower()
+            if not text:
+                continue
+
+            if not self.mention_re.search(text):
+                if text.endswith(":"):
+                    polarities = [c[2] for c in self._cues(text)]
+                    section = polarities[-1] if polarities else None
+                elif IGE_UNIT.search(text):
+                    ige_columns = True
+                continue
+
+            for clause in CLAUSE_SPLIT.split(text):
+                for name, polarity in self._clause_mentions(clause, section, ige_columns):
+                    if polarity == "pos" and name not in found:
+                        found.append(name)
+
+        return found
+
+    def extract(self, text):
+        """Return the allergens a report text marks as positive, in order of first mention."""
+        return self.extract_lines(text.splitlines())
+
+    def extract_batch(self, texts):
+        """Run `extract` over many reports."""
+        return [self.extract(text) for text in texts]
+
+
+_extractor = None
+_label_extractor = None
+_lock = threading.Lock()
+
+
+def get_extractor():
+    """Return the process-wide extractor, building it on first use."""
+    global _extractor
+    if _extractor is None:
+        with _lock:
+            if _extractor is None:
+                _extractor = AllergenExtractor()
+    return _extractor
+
+
+def get_label_extractor():
+    """Return the process-wide food label extractor, building it on first use."""
+    global _label_extractor
+    if _label_extractor is None:
+        with _lock:
+            if _label_extractor is None:
+                _label_extractor = AllergenExtractor(**LABEL_RULES)
+    return _label_extractor
+
+
+def extract_allergens(text):
+    """Extract allergens from report text locally, without any network calls."""
+    return get_extractor().extract(text)
+
+
+def extract_label_allergens(text):
+    """Extract the allergens a food label says the product contains (or may contain)."""
+    return get_label_extractor().extract(text)
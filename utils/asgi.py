@@ -0,0 +1,258 @@
+"""
+ASGI serving mode for the Flask app.
+
+`AsgiServer` serves the Flask app to an ASGI server such as uvicorn:
+
+- Requests run the ordinary Flask app on a thread pool sized by `ASGI_THREADS`
+  (asgiref's stock `WsgiToAsgi` runs them all on one thread).
+- Routes registered as coroutines `handler(call)` run on the event loop, so
+  they can await network calls (the Gemini check) without holding a thread.
+  Every step they hand to `call.run` runs on the pool inside a Flask request
+  context for the request, and their return value is turned into a response by
+  the app itself. Authentication, error handlers and after-request hooks (CORS,
+  compression) therefore apply exactly as they do to Flask views.
+
+Request bodies larger than `MAX_CONTENT_LENGTH` are refused with 413 before they
+are read. Coroutine routes only take small JSON bodies, so they are capped at
+`ASGI_MAX_BODY` when `MAX_CONTENT_LENGTH` is not set; other requests are
+spooled to disk above 64 KiB.
+"""
+
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from werkzeug.exceptions import RequestEntityTooLarge
+
+DEFAULT_THREADS = 32
+DEFAULT_MAX_BODY = 1024 * 1024
+SPOOL_SIZE = 64 * 1024
+
+
+def build_environ(scope, body):
+    """Build a WSGI environ for an ASGI HTTP `scope` whose body is the file-like `body`."""
+    script_name = scope.get("root_path", "").encode("utf8").decode("latin1")
+    path_info = scope["path"].encode("utf8").decode("latin1")
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+
+    server = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": script_name,
+        "PATH_INFO": path_info,
+        "QUERY_STRING": scope["query_string"].decode("ascii"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        # The whole body is buffered, so it can be read to EOF even when the
+        # client sent no Content-Length (chunked uploads).
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+
+    for name, value in scope["headers"]:
+        name = name.decode("latin1").upper().replace("-", "_")
+        if name not in ("CONTENT_LENGTH", "CONTENT_TYPE"):
+            name = f"HTTP_{name}"
+        value = value.decode("latin1")
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+class _Finished(Exception):
+    """Raised inside `run` when a step ended the request; carries the final response."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class NativeCall:
+    """One request to a coroutine route, handed to its handler."""
+
+    def __init__(self, server, scope, body):
+        self.server = server
+        self.scope = scope
+        self.body = body
+        self.preprocessed = False
+
+    async def run(self, fn, *args):
+        """
+        Run `fn(*args)` on the server's thread pool inside a request context for
+        this request. The app's before-request hooks run with the first step. If
+        a hook returns a response or a step raises, the app's error handling
+        produces the response and the handler is not resumed.
+        """
+        return await self.server._in_request(self, fn, *args)
+
+
+class AsgiServer:
+    """
+    ASGI application serving `flask_app`, with `routes` mapping (method, path)
+    to coroutine handlers `handler(call)` that return a Flask view return value.
+
+    Config:
+        ASGI_THREADS: Size of the thread pool for Flask requests and handler steps.
+        ASGI_MAX_BODY: Body limit for coroutine routes when MAX_CONTENT_LENGTH is unset.
+    """
+
+    def __init__(self, flask_app, routes=None):
+        self.flask_app = flask_app
+        self.routes = routes or {}
+        self.executor = ThreadPoolExecutor(
+            max_workers=flask_app.config.get("ASGI_THREADS", DEFAULT_THREADS),
+            thread_name_prefix="asgi",
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        handler = self.routes.get((scope["method"], scope["path"]))
+        limit = self.flask_app.config.get("MAX_CONTENT_LENGTH")
+        if handler is not None and limit is None:
+            limit = self.flask_app.config.get("ASGI_MAX_BODY", DEFAULT_MAX_BODY)
+
+        body = await self._read_body(scope, receive, limit)
+        if body is None:
+            response = await self._run(self._error_response, scope, RequestEntityTooLarge())
+            return await self._send_response(send, response)
+
+        if handler is None:
+            return await self._run(self._run_wsgi, scope, body, send, asyncio.get_running_loop())
+
+        with body:
+            data = body.read()
+        call = NativeCall(self, scope, data)
+        try:
+            rv = await handler(call)
+            response = await call.run(self._finalize, rv)
+        except _Finished as finished:
+            response = finished.response
+        await self._send_response(send, response)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _read_body(self, scope, receive, limit):
+        """Read the request body into a spooled file, or return None if it exceeds `limit`."""
+        if limit is not None:
+            for name, value in scope["headers"]:
+                if name == b"content-length" and value.isdigit() and int(value) > limit:
+                    return None
+
+        body = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        size = 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if limit is not None and size > limit:
+                body.close()
+                return None
+            body.write(chunk)
+            if not message.get("more_body"):
+                break
+        body.seek(0)
+        return body
+
+    def _in_request(self, call, fn, *args):
+        def step():
+            with self.flask_app.request_context(build_environ(call.scope, io.BytesIO(call.body))):
+                try:
+                    if not call.preprocessed:
+                        call.preprocessed = True
+                        rv = self.flask_app.preprocess_request()
+                        if rv is not None:
+                            raise _Finished(self._finalize(rv))
+                    return fn(*args)
+                except _Finished:
+                    raise
+                except Exception as e:
+                    raise _Finished(self._handle_error(e))
+
+        return self._run(step)
+
+    def _handle_error(self, e):
+        """Turn an exception into a response the way `Flask.wsgi_app` does. Needs a request context."""
+        try:
+            return self._finalize(self.flask_app.handle_user_exception(e))
+        except Exception as unhandled:
+            return self._materialize(self.flask_app.handle_exception(unhandled))
+
+    def _finalize(self, rv):
+        return self._materialize(self.flask_app.finalize_request(rv))
+
+    @staticmethod
+    def _materialize(response):
+        body = response.get_data()
+        response.close()
+        return response.status_code, response.headers.to_wsgi_list(), body
+
+    def _error_response(self, scope, error):
+        with self.flask_app.request_context(build_environ(scope, io.BytesIO())):
+            return self._handle_error(error)
+
+    async def _send_response(self, send, response):
+        status, headers, body = response
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(name.lower().encode("latin1"), value.encode("latin1")) for name, value in headers],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def _run_wsgi(self, scope, body, send, loop):
+        """Run the Flask app for one request on a pool thread, streaming its output back to the loop."""
+        def sync_send(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        start = {}
+
+        def start_response(status, headers, exc_info=None):
+            start["message"] = {
+                "type": "http.response.start",
+                "status": int(status.split(" ", 1)[0]),
+                "headers": [(name.lower().encode("latin1"), value.encode("latin1")) for name, value in headers],
+            }
+
+        with body:
+            output = self.flask_app(build_environ(scope, body), start_response)
+            try:
+                started = False
+                for chunk in output:
+                    if not chunk:
+                        continue
+                    if not started:
+                        sync_send(start["message"])
+                        started = True
+                    sync_send({"type": "http.response.body", "body": chunk, "more_body": True})
+                if not started:
+                    sync_send(start["message"])
+                sync_send({"type": "http.response.body"})
+            finally:
+                if hasattr(output, "close"):
+                    output.close()
@@ -0,0 +1,202 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from werkzeug.security import generate_password_hash
+from extensions import db
+from models.database import Allergy, AllergyChange, User
+
+CHUNK_SIZE = 500
+
+
+def export_users(chunk_size=CHUNK_SIZE):
+    """
+    Yield every user and their allergies as NDJSON lines.
+
+    Users are read in primary-key order one chunk at a time, with one allergy
+    query per chunk, so memory use does not grow with the table.
+    """
+    last_id = 0
+    while True:
+        users = db.session.execute(
+            db.select(User.id, User.email, User.username, User.password_hash)
+            .where(User.id > last_id)
+            .order_by(User.id)
+            .limit(chunk_size)
+        ).all()
+        if not users:
+            return
+
+        # The chunk holds every user with an id in this range, and a range
+        # reads the (user_id, name) index where a long IN list may not.
+        allergies = {}
+        for user_id, name in db.session.execute(
+            db.select(Allergy.user_id, Allergy.name)
+            .where(Allergy.user_id >= users[0].id, Allergy.user_id <= users[-1].id)
+            .order_by(Allergy.id)
+        ):
+            allergies.setdefault(user_id, []).append(name)
+
+        for user in users:
+            yield json.dumps({
+                "email": user.email,
+                "username": user.username,
+                "password_hash": user.password_hash,
+                "allergies": allergies.get(user.id, []),
+            }) + "\n"
+
+        last_id = users[-1].id
+        db.session.expunge_all()
+
+
+def read_checkpoint(path):
+    """Return the number of input lines already committed according to `path` (0 if missing)."""
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return int(f.read().strip() or 0)
+
+
+def write_checkpoint(path, line):
+    """Atomically record that the first `line` input lines are committed."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(str(line))
+    os.replace(tmp, path)
+
+
+def _parse(line):
+    """Return the normalized record on `line`, or None if it is not a valid user record."""
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        return None
+
+    fields = {key: record.get(key) for key in ("email", "username", "password", "password_hash")}
+    if any(value is not None and not isinstance(value, str) for value in fields.values()):
+        return None
+
+    email = (fields["email"] or "").strip()
+    username = (fields["username"] or "").strip()
+    if not email or not username or not (fields["password"] or fields["password_hash"]):
+        return None
+
+    names = record.get("allergies")
+    if names is None:
+        names = []
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        return None
+
+    allergies = []
+    for name in names:
+        normalized = name.strip().lower()
+        if normalized and normalized not in allergies:
+            allergies.append(normalized)
+
+    return {
+        "email": email,
+        "username": username,
+        "password": fields["password"],
+        "password_hash": fields["password_hash"],
+        "allergies": allergies,
+    }
+
+
+def _import_chunk(records, pool):
+    """Insert one chunk of parsed records in a single transaction. Returns (imported, skipped)."""
+    emails = {r["email"] for r in records}
+    usernames = {r["username"] for r in records}
+    taken = db.session.execute(
+        db.select(User.email, User.username).where(User.email.in_(emails) | User.username.in_(usernames))
+    ).all()
+    taken_emails = {row.email for row in taken}
+    taken_usernames = {row.username for row in taken}
+
+    fresh = []
+    for record in records:
+        if record["email"] in taken_emails or record["username"] in taken_usernames:
+            continue
+        taken_emails.add(record["email"])
+        taken_usernames.add(record["username"])
+        fresh.append(record)
+
+    to_hash = [r for r in fresh if not r["password_hash"]]
+    if to_hash:
+        for record, hashed in zip(to_hash, pool.map(generate_password_hash, [r["password"] for r in to_hash])):
+            record["password_hash"] = hashed
+
+    if fresh:
+        inserted = db.session.execute(
+            db.insert(User).returning(User.id, User.username),
+            [{
+                "email": r["email"],
+                "username": r["username"],
+                "password_hash": r["password_hash"],
+                "allergy_version": 1 if r["allergies"] else 0,
+            } for r in fresh],
+        ).all()
+        ids = {row.username: row.id for row in inserted}
+
+        allergy_rows = [
+            {"user_id": ids[r["username"]], "name": name}
+            for r in fresh for name in r["allergies"]
+        ]
+        if allergy_rows:
+            db.session.execute(db.insert(Allergy), allergy_rows)
+            db.session.execute(
+                db.insert(AllergyChange),
+                [dict(row, version=1, action="add") for row in allergy_rows],
+            )
+
+    db.session.commit()
+    return len(fresh), len(records) - len(fresh)
+
+
+def import_users(lines, skip=0, checkpoint=None, chunk_size=CHUNK_SIZE, workers=None):
+    """
+    Import users and allergies from an iterable of NDJSON lines.
+
+    Lines are consumed lazily and committed `chunk_size` at a time; plaintext
+    passwords in a chunk are hashed in a process pool. Users whose email or
+    username already exists are skipped. After each committed chunk the line
+    count is written to `checkpoint`, and an import restarted with the same
+    checkpoint (or `skip`) continues after the last committed line.
+
+    Returns:
+        dict: Counts of imported, skipped and invalid records, and the last committed line.
+    """
+    skip = max(skip, read_checkpoint(checkpoint))
+    stats = {"imported": 0, "skipped": 0, "invalid": 0, "line": skip}
+    lines = islice(lines, skip, None)
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        while True:
+            chunk = list(islice(lines, chunk_size))
+            if not chunk:
+                break
+
+            records = []
+            for line in chunk:
+                if isinstance(line, bytes):
+                    line = line.decode()
+                if not line.strip():
+                    continue
+                try:
+                    record = _parse(line)
+                except ValueError:
+                    record = None
+                if record is None:
+                    stats["invalid"] += 1
+                else:
+                    records.append(record)
+
+            if records:
+                imported, skipped = _import_chunk(records, pool)
+                stats["imported"] += imported
+                stats["skipped"] += skipped
+
+            stats["line"] += len(chunk)
+            if checkpoint:
+                write_checkpoint(checkpoint, stats["line"])
+
+    return stats
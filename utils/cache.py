@@ -0,0 +1,267 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+def dumps(value):
+    """
+    Serialize a cache value to JSON bytes. Entries in the SQLite file and in Redis
+    are readable by anyone who can write them, so only plain data is stored: values
+    must be JSON-serializable, and tuples come back as lists.
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class LRUBackend:
+    """In-process LRU with per-entry expiry. Fast, but private to one worker."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            data, expires = entry
+            if expires is not None and expires <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return data
+
+    def set(self, key, data, ttl=None):
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (data, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self, prefix=""):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+
+class SQLiteBackend:
+    """
+    Cache stored in a SQLite file in WAL mode with memory-mapped reads, so every
+    worker on a node shares entries. Expired rows are skipped on read and purged
+    periodically on write.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path, mmap_size=256 * 1024 * 1024):
+        self.path = path
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, data, ttl=None):
+        conn = self._connect()
+        expires = time.time() + ttl if ttl else None
+        conn.execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)", (key, data, expires))
+
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self, prefix=""):
+        self._connect().execute("DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+
+
+class RedisBackend:
+    """Cache shared by every worker on every node through Redis."""
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError("The redis package is required for the redis cache backend")
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, data, ttl=None):
+        self._client.set(key, data, px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key):
+        self._client.delete(key)
+
+    def clear(self, prefix=""):
+        pattern = re.sub(r"([*?\[\]\\])", r"\\\1", prefix) + "*"
+        for key in self._client.scan_iter(match=pattern, count=500):
+            self._client.delete(key)
+
+
+class Namespace:
+    """
+    A group of cache keys sharing a prefix and a TTL, with its own hit/miss counters.
+    Counters are per process.
+    """
+
+    def __init__(self, cache, name, ttl=None):
+        self.cache = cache
+        self.name = name
+        self._ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+
+    @property
+    def ttl(self):
+        ttls = self.cache.config.get("CACHE_TTLS", {})
+        return ttls.get(self.name, self._ttl if self._ttl is not None else self.cache.config.get("CACHE_DEFAULT_TTL"))
+
+    def _key(self, key):
+        return f"{self.name}:{key if isinstance(key, str) else repr(key)}"
+
+    def get(self, key, default=None):
+        data = self.cache.backend.get(self._key(key))
+        if data is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return loads(data)
+
+    def set(self, key, value, ttl=None):
+        self.sets += 1
+        self.cache.backend.set(self._key(key), dumps(value), ttl if ttl is not None else self.ttl)
+
+    def delete(self, key):
+        self.cache.backend.delete(self._key(key))
+
+    def get_or_set(self, key, fn, ttl=None):
+        """Return the cached value for `key`, computing and storing it with `fn()` on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = fn()
+            self.set(key, value, ttl)
+        return value
+
+    def clear(self):
+        self.cache.backend.clear(f"{self.name}:")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "ttl": self.ttl,
+        }
+
+
+class Cache:
+    """
+    Flask extension holding the configured cache backend.
+
+    Config:
+        CACHE_BACKEND: "lru" (default), "sqlite" or "redis".
+        CACHE_MAX_ENTRIES: LRU size limit.
+        CACHE_SQLITE_PATH: Cache file for the sqlite backend (default: instance/cache.sqlite3).
+        CACHE_REDIS_URL: Connection URL for the redis backend.
+        CACHE_DEFAULT_TTL: TTL in seconds for namespaces without one.
+        CACHE_TTLS: Per-namespace TTL overrides, e.g. {"verdicts": 86400}.
+    """
+
+    def __init__(self, app=None):
+        self.config = {}
+        self._backend = None
+        self._namespaces = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("CACHE_BACKEND", "lru")
+        app.config.setdefault("CACHE_MAX_ENTRIES", 10000)
+        app.config.setdefault("CACHE_SQLITE_PATH", os.path.join(app.instance_path, "cache.sqlite3"))
+        app.config.setdefault("CACHE_REDIS_URL", "redis://localhost:6379/0")
+        app.config.setdefault("CACHE_DEFAULT_TTL", 300)
+        app.config.setdefault("CACHE_TTLS", {})
+
+        self.config = app.config
+        self._backend = self._make_backend(app.config)
+        app.extensions["cache"] = self
+
+    @staticmethod
+    def _make_backend(config):
+        kind = config["CACHE_BACKEND"]
+        if kind == "lru":
+            return LRUBackend(config["CACHE_MAX_ENTRIES"])
+        if kind == "sqlite":
+            os.makedirs(os.path.dirname(os.path.abspath(config["CACHE_SQLITE_PATH"])), exist_ok=True)
+            return SQLiteBackend(config["CACHE_SQLITE_PATH"])
+        if kind == "redis":
+            return RedisBackend(config["CACHE_REDIS_URL"])
+        raise ValueError(f"Unknown CACHE_BACKEND: {kind}")
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = LRUBackend()
+        return self._backend
+
+    def namespace(self, name, ttl=None):
+        """Return the namespace `name`, creating it with default `ttl` on first use."""
+        if name not in self._namespaces:
+            self._namespaces[name] = Namespace(self, name, ttl)
+        return self._namespaces[name]
+
+    def stats(self):
+        return {name: ns.stats() for name, ns in self._namespaces.items()}
@@ -1,12 +1,84 @@
 import pytesseract
 from PIL import Image
 import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+OCR_WORKERS = 4
+
+INGREDIENTS_HEADING = re.compile(r"\bingredients?\s*[:\-]?", re.IGNORECASE)
+CONTAINS_STATEMENT = re.compile(r"^\s*(?:may\s+)?contains?\b.*$", re.IGNORECASE | re.MULTILINE)
+SECTION_END = re.compile(
+    r"^\s*(?:nutrition\s+facts|serving\s+size|directions|storage|store\s+in|keep\s+refrigerated"
+    r"|distributed\s+by|manufactured\s+(?:by|for)|packed\s+(?:by|for)|net\s+w(?:ei)?g?h?t|best\s+before)\b",
+    re.IGNORECASE | re.MULTILINE,
+)
 
 def extract_text_from_image(image_path):
-    """Extract text from an image using Tesseract OCR."""
-    try:
-        text = pytesseract.image_to_string(Image.open(image_path))
-        return text.strip()
-    except Exception as e:
-        print(f"Error extracting text: {e}")
-        return ""
+    """Extract text from an image using Tesseract OCR. Raises if the image cannot be read."""
+    text = pytesseract.image_to_string(Image.open(image_path))
+    return text.strip()
+
+def extract_text_from_images(images, workers=OCR_WORKERS):
+    """
+    OCR several images in parallel. Tesseract runs as a subprocess, so a thread
+    pool is enough to use several cores.
+
+    Args:
+        images: Paths or file-like objects, in label order.
+
+    Returns:
+        A list of (text, seconds, error) tuples in the same order as `images`.
+        `error` is None, or a message if the image could not be OCR'd (its text
+        is then empty).
+    """
+    def timed(image):
+        start = time.perf_counter()
+        try:
+            text, error = extract_text_from_image(image), None
+        except Exception as e:
+            text, error = "", f"OCR failed: {e}"
+        return text, time.perf_counter() - start, error
+
+    if len(images) <= 1:
+        return [timed(image) for image in images]
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(images))) as executor:
+        return list(executor.map(timed, images))
+
+def _line_key(line):
+    return re.sub(r"[^a-z0-9]+", " ", line.lower()).strip()
+
+def merge_label_text(texts):
+    """
+    Merge the OCR text of several photos of one package into a single text.
+    Lines that appear on more than one photo (overlapping shots, text repeated
+    on each side) are kept only once, at their first occurrence.
+    """
+    seen = set()
+    merged = []
+    for text in texts:
+        for line in text.splitlines():
+            key = _line_key(line)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            merged.append(line.strip())
+    return "\n".join(merged)
+
+def find_ingredients_section(text):
+    """
+    Return the ingredient list and allergen statement ("Contains: ...") from
+    label text. Falls back to the whole text if no ingredients heading is found.
+    """
+    heading = INGREDIENTS_HEADING.search(text)
+    if heading is None:
+        return text
+
+    rest = text[heading.end():]
+    end = SECTION_END.search(rest)
+    section = rest[:end.start()] if end else rest
+
+    statements = [m.group().strip() for m in CONTAINS_STATEMENT.finditer(text) if m.group().strip() not in section]
+    return "\n".join([section.strip()] + statements).strip()
@@ -0,0 +1,189 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models.database import Product, UserProductVerdict
+from utils.verdicts import UPSERT_INSERTS
+
+MIN_SUGGESTION_SCORE = 0.3
+REFRESH_INTERVAL = 30
+
+def normalize(name):
+    """Lowercase a product name and collapse runs of whitespace."""
+    return " ".join(name.lower().split())
+
+def trigrams(name):
+    """Return the set of word trigrams of a name, padded like pg_trgm (two spaces in front, one behind)."""
+    grams = set()
+    for word in normalize(name).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def similarity(a_grams, b_grams):
+    """Jaccard similarity of two trigram sets."""
+    if not a_grams or not b_grams:
+        return 0.0
+    return len(a_grams & b_grams) / len(a_grams | b_grams)
+
+def is_abbreviation(query, name):
+    """True if every word of `query` is a prefix of the matching word in `name` ("choc bar" -> "chocolate bar")."""
+    query_words = query.split()
+    name_words = name.split()
+    return len(query_words) == len(name_words) and all(
+        n.startswith(q) and (len(q) >= 3 or q == n) for q, n in zip(query_words, name_words)
+    )
+
+
+class ProductIndex:
+    """
+    In-memory trigram index over curated product names.
+
+    Only products marked `curated` (seeded with `flask admin seed-products`) are
+    suggested to everyone. Names users type in are private: `search` adds the
+    products the searching user has checked, so one user's checks are never
+    suggested to another. The index is loaded lazily and reloaded when the
+    curated list changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names = []
+        self._grams = {}
+        self._postings = defaultdict(set)
+        self._version = None
+        self._checked_at = None
+
+    def _add(self, name):
+        if name in self._grams:
+            return
+        grams = trigrams(name)
+        self._grams[name] = grams
+        for gram in grams:
+            self._postings[gram].add(name)
+        bisect.insort(self._names, name)
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < REFRESH_INTERVAL:
+            return
+        self._checked_at = now
+
+        version = tuple(db.session.execute(
+            db.select(db.func.count(Product.id), db.func.max(Product.id)).where(Product.curated.is_(True))
+        ).one())
+        if version == self._version:
+            return
+
+        names = db.session.execute(db.select(Product.name).where(Product.curated.is_(True))).scalars().all()
+        with self._lock:
+            self._names = []
+            self._grams = {}
+            self._postings = defaultdict(set)
+            for name in names:
+                self._add(name)
+            self._version = version
+
+    def _candidates(self, query, grams):
+        candidates = set()
+        for gram in grams:
+            candidates |= self._postings.get(gram, set())
+
+        start = bisect.bisect_left(self._names, query)
+        for name in self._names[start:start + 50]:
+            if not name.startswith(query):
+                break
+            candidates.add(name)
+        return candidates
+
+    def _score(self, query, grams, name, name_grams):
+        score = similarity(grams, name_grams)
+        if name.startswith(query) or is_abbreviation(query, name):
+            score += 1.0
+        return score
+
+    def search(self, query, limit=10, user_id=None):
+        """
+        Return up to `limit` names ranked by prefix match and trigram similarity,
+        from the curated products plus those `user_id` has checked.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+
+        self._refresh()
+        grams = trigrams(query)
+        with self._lock:
+            scored = {
+                name: self._score(query, grams, name, self._grams[name])
+                for name in self._candidates(query, grams)
+            }
+
+        if user_id is not None:
+            own = db.session.execute(
+                db.select(Product.name)
+                .join(UserProductVerdict, UserProductVerdict.product_id == Product.id)
+                .where(UserProductVerdict.user_id == int(user_id))
+            ).scalars().all()
+            for name in own:
+                if name not in scored:
+                    scored[name] = self._score(query, grams, name, trigrams(name))
+
+        scored = [(score, name) for name, score in scored.items()]
+        scored.sort(key=lambda item: (-item[0], len(item[1]), item[1]))
+        return [name for score, name in scored[:limit] if score >= MIN_SUGGESTION_SCORE]
+
+    def resolve(self, product_name):
+        """
+        Map a free-text product name to its canonical name, registering it as a new
+        product if it has not been seen. Caller commits.
+
+        Only exact matches after `normalize` count. Fuzzy matches can merge
+        different products ("pea soup" and "peanut soup"), which is unsafe for
+        an allergy verdict, so they are offered only as `search` suggestions.
+        """
+        query = normalize(product_name)
+        with self._lock:
+            if query in self._grams:
+                return query
+
+        if Product.query.filter_by(name=query).first() is not None:
+            return query
+
+        dialect = db.session.get_bind().dialect.name
+        if dialect in UPSERT_INSERTS:
+            db.session.execute(
+                UPSERT_INSERTS[dialect](Product).values(name=query).on_conflict_do_nothing(index_elements=["name"])
+            )
+            return query
+
+        try:
+            with db.session.begin_nested():
+                db.session.add(Product(name=query))
+        except IntegrityError:
+            if Product.query.filter_by(name=query).first() is None:
+                raise
+
+        return query
+
+
+def seed_products(names, chunk_size=500):
+    """
+    Mark `names` as curated products, creating any that do not exist yet.
+    Caller commits. Returns the number of distinct names seeded.
+    """
+    names = sorted({normalize(name) for name in names if name.strip()})
+    for start in range(0, len(names), chunk_size):
+        chunk = names[start:start + chunk_size]
+        existing = set(db.session.execute(db.select(Product.name).where(Product.name.in_(chunk))).scalars())
+        if existing:
+            db.session.execute(db.update(Product).where(Product.name.in_(existing)).values(curated=True))
+        new = [{"name": name, "curated": True} for name in chunk if name not in existing]
+        if new:
+            db.session.execute(db.insert(Product), new)
+    return len(names)
+
+
+product_index = ProductIndex()
@@ -0,0 +1,295 @@
+import os
+import queue
+import threading
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from extensions import db
+from models.database import Allergy, Product, User, UserProductVerdict
+from utils.ai_processing import check_product_safety
+
+BATCH_SIZE = 20
+LEASE_SECONDS = 600
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def save_verdict(user_id, product_name, verdict, explanation, allergy_version):
+    """
+    Insert or update the materialized verdict for one user and product. Caller commits.
+
+    A single upsert, so concurrent checks of the same product (which the
+    single-flight releases together) cannot collide on uq_user_product_verdict.
+    """
+    product_id = db.session.execute(
+        db.select(Product.id).where(Product.name == product_name)
+    ).scalar_one()
+
+    values = {
+        "verdict": verdict,
+        "explanation": explanation,
+        "allergy_version": allergy_version,
+        "stale": False,
+        "refreshing_until": None,
+        "checked_at": datetime.utcnow(),
+    }
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in UPSERT_INSERTS:
+        return _save_verdict_fallback(int(user_id), product_id, values)
+
+    db.session.execute(
+        UPSERT_INSERTS[dialect](UserProductVerdict)
+        .values(user_id=int(user_id), product_id=product_id, **values)
+        .on_conflict_do_update(index_elements=["user_id", "product_id"], set_=values)
+    )
+
+
+def _save_verdict_fallback(user_id, product_id, values):
+    """Insert-or-update for databases without ON CONFLICT, retrying as an update on a lost race."""
+    updated = db.session.execute(
+        db.update(UserProductVerdict)
+        .where(UserProductVerdict.user_id == user_id, UserProductVerdict.product_id == product_id)
+        .values(**values)
+    ).rowcount
+    if updated:
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.execute(db.insert(UserProductVerdict).values(user_id=user_id, product_id=product_id, **values))
+    except IntegrityError:
+        db.session.execute(
+            db.update(UserProductVerdict)
+            .where(UserProductVerdict.user_id == user_id, UserProductVerdict.product_id == product_id)
+            .values(**values)
+        )
+
+
+def get_fresh_verdict(user_id, product_name):
+    """Return the stored (verdict, explanation) if it is up to date, else None."""
+    row = db.session.execute(
+        db.select(UserProductVerdict.verdict, UserProductVerdict.explanation)
+        .join(Product, Product.id == UserProductVerdict.product_id)
+        .where(
+            UserProductVerdict.user_id == int(user_id),
+            Product.name == product_name,
+            UserProductVerdict.stale.is_(False),
+        )
+    ).first()
+    return (row.verdict, row.explanation) if row else None
+
+
+def mark_stale(user_id, added=(), removed=()):
+    """
+    Flag the verdicts an allergy change could flip and queue them for recompute.
+
+    Adding allergies cannot make an unsafe product safe, and removing them cannot
+    make a safe product unsafe, so only the other rows are touched.
+    """
+    query = db.update(UserProductVerdict).where(
+        UserProductVerdict.user_id == int(user_id),
+        UserProductVerdict.stale.is_(False),
+    )
+    if added and not removed:
+        query = query.where(UserProductVerdict.verdict != "Unsafe")
+    elif removed and not added:
+        query = query.where(UserProductVerdict.verdict != "Safe")
+
+    if db.session.execute(query.values(stale=True)).rowcount:
+        refresher.enqueue(user_id)
+
+
+class VerdictRefresher:
+    """
+    Background worker that recomputes stale verdicts in batches.
+
+    Users are queued on the session and handed to the worker thread only after
+    the surrounding transaction commits. Stale flags live in the database, so
+    the worker is started by `init_app` and first sweeps up rows left stale by
+    a previous process (not for `flask` CLI commands other than `flask run`).
+
+    Every worker process runs its own refresher, so rows are claimed with a
+    lease (`refreshing_until`) before the AI is asked; a row is recomputed by
+    one process at a time, and a crashed process's claims expire after
+    `VERDICT_REFRESH_LEASE` seconds.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, lease=LEASE_SECONDS):
+        self.app = None
+        self.batch_size = batch_size
+        self.lease = lease
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault("VERDICT_REFRESH_ENABLED", True)
+        app.config.setdefault("VERDICT_REFRESH_BATCH_SIZE", self.batch_size)
+        app.config.setdefault("VERDICT_REFRESH_LEASE", self.lease)
+        self.app = app
+        self.batch_size = app.config["VERDICT_REFRESH_BATCH_SIZE"]
+        self.lease = app.config["VERDICT_REFRESH_LEASE"]
+        app.extensions["verdict_refresher"] = self
+        if app.config["VERDICT_REFRESH_ENABLED"] and not _in_cli_command():
+            self._ensure_thread()
+
+    def enqueue(self, user_id):
+        """Schedule `user_id` for a refresh once the current transaction commits."""
+        db.session.info.setdefault("verdict_refresh", set()).add(int(user_id))
+
+    def _submit(self, user_ids):
+        if self.app is None or not self.app.config["VERDICT_REFRESH_ENABLED"]:
+            return
+        self._ensure_thread()
+        for user_id in user_ids:
+            self._queue.put(user_id)
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        with self.app.app_context():
+            try:
+                stale_users = self.stale_user_ids()
+            except Exception as e:
+                # e.g. `flask db upgrade` on a database without the table yet.
+                print("Error sweeping stale verdicts:", e)
+                stale_users = []
+            finally:
+                db.session.remove()
+            for user_id in stale_users:
+                self._queue.put(user_id)
+
+        while True:
+            user_id = self._queue.get()
+            with self.app.app_context():
+                try:
+                    self.refresh_user(user_id)
+                except Exception as e:
+                    print(f"Error refreshing verdicts for user {user_id}:", e)
+                finally:
+                    db.session.remove()
+
+    def stale_user_ids(self):
+        """Return the users that have stale verdicts, e.g. left by a previous process."""
+        return db.session.execute(
+            db.select(UserProductVerdict.user_id).where(UserProductVerdict.stale.is_(True)).distinct()
+        ).scalars().all()
+
+    def refresh_user(self, user_id):
+        """
+        Recompute a user's stale verdicts, committing one batch at a time. Rows
+        another process has claimed are left to it.
+        """
+        while True:
+            version = db.session.execute(
+                db.select(User.allergy_version).where(User.id == user_id)
+            ).scalar()
+            if version is None:
+                return
+
+            now = datetime.utcnow()
+            rows = db.session.execute(
+                db.select(UserProductVerdict.id, Product.name)
+                .join(Product, Product.id == UserProductVerdict.product_id)
+                .where(
+                    UserProductVerdict.user_id == user_id,
+                    UserProductVerdict.stale.is_(True),
+                    _unclaimed(now),
+                )
+                .limit(self.batch_size)
+            ).all()
+            if not rows:
+                return
+
+            rows = [row for row in rows if self._claim(row.id, now)]
+            db.session.commit()
+            if not rows:
+                continue
+
+            allergies = db.session.execute(
+                db.select(Allergy.name).where(Allergy.user_id == user_id)
+            ).scalars().all()
+            db.session.rollback()
+
+            updated = 0
+            for row in rows:
+                verdict, explanation = check_product_safety(row.name, allergies)
+                if verdict == "Error":
+                    continue
+                # Only write if no allergy change landed while the AI call ran.
+                updated += db.session.execute(
+                    db.update(UserProductVerdict)
+                    .where(
+                        UserProductVerdict.id == row.id,
+                        db.select(User.id).where(User.id == user_id, User.allergy_version == version).exists(),
+                    )
+                    .values(
+                        verdict=verdict,
+                        explanation=explanation,
+                        allergy_version=version,
+                        stale=False,
+                        refreshing_until=None,
+                        checked_at=datetime.utcnow(),
+                    )
+                ).rowcount
+            # Rows left stale (AI error, allergies changed meanwhile) go back to the pool.
+            db.session.execute(
+                db.update(UserProductVerdict)
+                .where(UserProductVerdict.id.in_([row.id for row in rows]))
+                .values(refreshing_until=None)
+            )
+            db.session.commit()
+
+            if not updated and self._version_unchanged(user_id, version):
+                return
+
+    def _claim(self, verdict_id, now):
+        """Lease one stale row to this process; False if another process holds it."""
+        return db.session.execute(
+            db.update(UserProductVerdict)
+            .where(UserProductVerdict.id == verdict_id, UserProductVerdict.stale.is_(True), _unclaimed(now))
+            .values(refreshing_until=now + timedelta(seconds=self.lease))
+        ).rowcount == 1
+
+    def _version_unchanged(self, user_id, version):
+        current = db.session.execute(
+            db.select(User.allergy_version).where(User.id == user_id)
+        ).scalar()
+        return current == version
+
+
+def _unclaimed(now):
+    return db.or_(UserProductVerdict.refreshing_until.is_(None), UserProductVerdict.refreshing_until < now)
+
+
+def _in_cli_command():
+    """True while the app is being created for a `flask` command other than `flask run`."""
+    if os.environ.get("FLASK_RUN_FROM_CLI") != "true":
+        return False
+    ctx = click.get_current_context(silent=True)
+    return ctx is None or ctx.info_name != "run"
+
+
+refresher = VerdictRefresher()
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_refreshes(session):
+    user_ids = session.info.pop("verdict_refresh", None)
+    if user_ids:
+        refresher._submit(user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_refreshes(session):
+    session.info.pop("verdict_refresh", None)